@@ -1,7 +1,7 @@
 """
 Module where the version is written.
 
-It is executed in setup.py and imported in modred/__init__.py.
+It is read in setup.py and imported in modred/__init__.py.
 
 See:
 
@@ -86,9 +86,9 @@ def compute_BPOD_arrays(
     if parallel.is_distributed():
         raise RuntimeError('Cannot run in parallel.')
 
-    # Force data to be arrays (not matrices)
-    direct_vecs = np.array(direct_vecs)
-    adjoint_vecs = np.array(adjoint_vecs)
+    # Force data to be arrays (not matrices), without copying them
+    direct_vecs = np.asarray(direct_vecs)
+    adjoint_vecs = np.asarray(adjoint_vecs)
 
     # Set up vector space (for inner products)
     vec_space = VectorSpaceArrays(weights=inner_product_weights)
@@ -118,19 +118,20 @@ def compute_BPOD_arrays(
     # Compute BPOD modes
     L_sing_vecs, sing_vals, R_sing_vecs = util.svd(
         Hankel_array, atol=atol, rtol=rtol)
-    sing_vals_sqrt_inv = np.diag(sing_vals ** -0.5)
-    direct_build_coeffs = R_sing_vecs.dot(sing_vals_sqrt_inv)
+    sing_vals_sqrt_inv = sing_vals ** -0.5
+    direct_build_coeffs = R_sing_vecs * sing_vals_sqrt_inv
     direct_modes = vec_space.lin_combine(
         direct_vecs, direct_build_coeffs,
         coeff_array_col_indices=direct_mode_indices)
-    adjoint_build_coeffs = L_sing_vecs.dot(sing_vals_sqrt_inv)
+    adjoint_build_coeffs = L_sing_vecs * sing_vals_sqrt_inv
     adjoint_modes = vec_space.lin_combine(
         adjoint_vecs, adjoint_build_coeffs,
         coeff_array_col_indices=adjoint_mode_indices)
 
     # Compute projection coefficients
-    direct_proj_coeffs = np.diag(sing_vals ** 0.5).dot(R_sing_vecs.conj().T)
-    adjoint_proj_coeffs = np.diag(sing_vals ** 0.5).dot(L_sing_vecs.conj().T)
+    sing_vals_sqrt = (sing_vals ** 0.5)[:, np.newaxis]
+    direct_proj_coeffs = sing_vals_sqrt * R_sing_vecs.conj().T
+    adjoint_proj_coeffs = sing_vals_sqrt * L_sing_vecs.conj().T
 
     # Return a namedtuple
     BPOD_results = namedtuple(
@@ -438,7 +439,7 @@ class BPODHandles(object):
             self.direct_vec_handles = util.make_iterable(direct_vec_handles)
         if self.direct_vec_handles is None:
             raise util.UndefinedError('direct_vec_handles undefined')
-        build_coeffs = self.R_sing_vecs.dot(np.diag(self.sing_vals ** -0.5))
+        build_coeffs = self.R_sing_vecs * self.sing_vals ** -0.5
         self.vec_space.lin_combine(
             mode_handles, self.direct_vec_handles, build_coeffs,
             coeff_array_col_indices=mode_indices)
@@ -463,7 +464,7 @@ class BPODHandles(object):
             self.adjoint_vec_handles = util.make_iterable(adjoint_vec_handles)
         if self.adjoint_vec_handles is None:
             raise util.UndefinedError('adjoint_vec_handles undefined')
-        build_coeffs = self.L_sing_vecs.dot(np.diag(self.sing_vals ** -0.5))
+        build_coeffs = self.L_sing_vecs * self.sing_vals ** -0.5
         self.vec_space.lin_combine(
             mode_handles, self.adjoint_vec_handles, build_coeffs,
             coeff_array_col_indices=mode_indices)
@@ -479,8 +480,8 @@ class BPODHandles(object):
             modes.  Columns correspond to direct vector objects, rows
             correspond to direct BPOD modes.
         """
-        self.direct_proj_coeffs = np.diag(self.sing_vals ** 0.5).dot(
-            self.R_sing_vecs.conj().T)
+        self.direct_proj_coeffs = (
+            (self.sing_vals ** 0.5)[:, np.newaxis] * self.R_sing_vecs.conj().T)
         return self.direct_proj_coeffs
 
 
@@ -494,6 +495,6 @@ class BPODHandles(object):
             adjoint BPOD modes.  Columns correspond to adjoint vector objects,
             rows correspond to adjoint BPOD modes.
         """
-        self.adjoint_proj_coeffs = np.diag(self.sing_vals ** 0.5).dot(
-            self.L_sing_vecs.conj().T)
+        self.adjoint_proj_coeffs = (
+            (self.sing_vals ** 0.5)[:, np.newaxis] * self.L_sing_vecs.conj().T)
         return self.adjoint_proj_coeffs
@@ -109,10 +109,10 @@ def compute_DMD_arrays_snaps_method(
     if parallel.is_distributed():
         raise RuntimeError('Cannot run in parallel.')
 
-    # Force data to be arrays (not matrices)
-    vecs = np.array(vecs)
+    # Force data to be arrays (not matrices), without copying them
+    vecs = np.asarray(vecs)
     if adv_vecs is not None:
-        adv_vecs = np.array(adv_vecs)
+        adv_vecs = np.asarray(adv_vecs)
 
     # Set up vector space (for inner products)
     vec_space = VectorSpaceArrays(weights=inner_product_weights)
@@ -324,10 +324,10 @@ def compute_DMD_arrays_direct_method(
     if parallel.is_distributed():
         raise RuntimeError('Cannot run in parallel.')
 
-    # Force data to be arrays (not matrices)
-    vecs = np.array(vecs)
+    # Force data to be arrays (not matrices), without copying them
+    vecs = np.asarray(vecs)
     if adv_vecs is not None:
-        adv_vecs = np.array(adv_vecs)
+        adv_vecs = np.asarray(adv_vecs)
 
     # Set up vector space (for inner products)
     vec_space = VectorSpaceArrays(weights=inner_product_weights)
@@ -1231,10 +1231,10 @@ def compute_TLSqrDMD_arrays_snaps_method(
     if parallel.is_distributed():
         raise RuntimeError('Cannot run in parallel.')
 
-    # Force data to be arrays (not matrices)
-    vecs = np.array(vecs)
+    # Force data to be arrays (not matrices), without copying them
+    vecs = np.asarray(vecs)
     if adv_vecs is not None:
-        adv_vecs = np.array(adv_vecs)
+        adv_vecs = np.asarray(adv_vecs)
 
     # Set up vector space (for inner products)
     vec_space = VectorSpaceArrays(weights=inner_product_weights)
@@ -1506,10 +1506,10 @@ def compute_TLSqrDMD_arrays_direct_method(
     if parallel.is_distributed():
         raise RuntimeError('Cannot run in parallel.')
 
-    # Force data to be arrays (not matrices)
-    vecs = np.array(vecs)
+    # Force data to be arrays (not matrices), without copying them
+    vecs = np.asarray(vecs)
     if adv_vecs is not None:
-        adv_vecs = np.array(adv_vecs)
+        adv_vecs = np.asarray(adv_vecs)
 
     # Set up vector space (for inner products)
     vec_space = VectorSpaceArrays(weights=inner_product_weights)
@@ -202,16 +202,17 @@ class ERA(object):
         Er = self.sing_vals[:num_states]
         Vr = self.R_sing_vecs[:, :num_states]
 
-        self.A = np.diag(Er ** -0.5).dot(
+        Er_sqrt_inv = Er ** -0.5
+        self.A = Er_sqrt_inv[:, np.newaxis] * (
             Ur.conj().T.dot(
                 self.Hankel_array2.dot(
-                    Vr.dot(
-                        np.diag(Er ** -0.5)))))
-        self.B = np.diag(Er ** 0.5).dot((Vr.conj().T)[:, :self.num_inputs])
+                    Vr * Er_sqrt_inv)))
+        self.B = (Er ** 0.5)[:, np.newaxis] * (
+            (Vr.conj().T)[:, :self.num_inputs])
         # *dt above is removed, users must do this themselves.
         # It is explained in the docs.
 
-        self.C = Ur[:self.num_Markovs].dot(np.diag(Er ** 0.5))
+        self.C = Ur[:self.num_Markovs] * Er ** 0.5
 
         if (np.abs(np.linalg.eigvals(self.A)) >= 1.).any() and self.verbosity:
             print(
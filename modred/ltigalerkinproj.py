@@ -70,7 +70,7 @@ def compute_derivs_arrays(vecs, adv_vecs, dt):
     Computes d(``vec``)/dt = ( ``vec``\(t=dt) -  ``vec``\(t=0) ) / dt.
     """
     # Force data to be arrays, then compute derivatives
-    return (np.array(adv_vecs) - np.array(vecs))/(1. * dt)
+    return (np.asarray(adv_vecs) - np.asarray(vecs))/(1. * dt)
 
 
 class LTIGalerkinProjectionBase(object):
@@ -71,8 +71,8 @@ def compute_POD_arrays_snaps_method(
     if parallel.is_distributed():
         raise RuntimeError('Cannot run in parallel.')
 
-    # Force data to be arrays (not matrices)
-    vecs = np.array(vecs)
+    # Force data to be arrays (not matrices), without copying them
+    vecs = np.asarray(vecs)
 
     # Set up vector space (for inner products)
     vec_space = VectorSpaceArrays(weights=inner_product_weights)
@@ -83,12 +83,12 @@ def compute_POD_arrays_snaps_method(
         correlation_array, atol=atol, rtol=rtol, is_positive_definite=True)
 
     # Compute modes
-    build_coeffs = eigvecs.dot(np.diag(eigvals ** -0.5))
+    build_coeffs = eigvecs * eigvals ** -0.5
     modes = vec_space.lin_combine(
         vecs, build_coeffs, coeff_array_col_indices=mode_indices)
 
     # Compute projection coefficients
-    proj_coeffs = np.diag(eigvals ** 0.5).dot(eigvecs.conj().T)
+    proj_coeffs = (eigvals ** 0.5)[:, np.newaxis] * eigvecs.conj().T
 
     # Return a namedtuple
     POD_results = namedtuple(
@@ -161,8 +161,8 @@ def compute_POD_arrays_direct_method(
     if parallel.is_distributed():
         raise RuntimeError('Cannot run in parallel.')
 
-    # Force data to be arrays (not matrices)
-    vecs = np.array(vecs)
+    # Force data to be arrays (not matrices), without copying them
+    vecs = np.asarray(vecs)
 
     # If no inner product weights, compute SVD directly
     if inner_product_weights is None:
@@ -174,13 +174,13 @@ def compute_POD_arrays_direct_method(
     # accordingly
     elif inner_product_weights.ndim == 1:
         sqrt_weights = inner_product_weights ** 0.5
-        vecs_weighted = np.diag(sqrt_weights).dot(vecs)
+        vecs_weighted = sqrt_weights[:, np.newaxis] * vecs
         modes_weighted, sing_vals, eigvecs = util.svd(
             vecs_weighted, atol=atol, rtol=rtol)
         if mode_indices is None:
             mode_indices = range(sing_vals.size)
-        modes = np.diag(sqrt_weights ** -1.).dot(
-            modes_weighted[:, mode_indices])
+        modes = (
+            modes_weighted[:, mode_indices] / sqrt_weights[:, np.newaxis])
     # For 2D inner product weights, compute Cholesky factorization and weight
     # vecs accordingly.
     elif inner_product_weights.ndim == 2:
@@ -198,7 +198,7 @@ def compute_POD_arrays_direct_method(
 
     # Compute projection coefficients
     eigvals = sing_vals ** 2.
-    proj_coeffs = np.diag(eigvals ** 0.5).dot(eigvecs.conj().T)
+    proj_coeffs = (eigvals ** 0.5)[:, np.newaxis] * eigvecs.conj().T
 
     # Return a namedtuple
     POD_results = namedtuple(
@@ -408,7 +408,7 @@ class PODHandles(object):
         """
         if vec_handles is not None:
             self.vec_handles = util.make_iterable(vec_handles)
-        build_coeffs = np.dot(self.eigvecs, np.diag(self.eigvals**-0.5))
+        build_coeffs = self.eigvecs * self.eigvals ** -0.5
         self.vec_space.lin_combine(
             mode_handles, self.vec_handles, build_coeffs,
             coeff_array_col_indices=mode_indices)
@@ -422,6 +422,6 @@ class PODHandles(object):
             objects, expressed as a linear combination of POD modes.  Columns
             correspond to vector objects, rows correspond to POD modes.
         """
-        self.proj_coeffs = np.diag(self.eigvals ** 0.5).dot(
-            self.eigvecs.conj().T)
+        self.proj_coeffs = (
+            (self.eigvals ** 0.5)[:, np.newaxis] * self.eigvecs.conj().T)
         return self.proj_coeffs
@@ -7,58 +7,76 @@ from shutil import rmtree
 import copy
 
 import numpy as np
+import scipy.linalg
 
 from modred import bpod, parallel, util
-from modred.py2to3 import range
 from modred.vectorspace import VectorSpaceArrays, VectorSpaceHandles
 from modred.vectors import VecHandlePickle
 
 
-def get_system_arrays(num_states, num_inputs, num_outputs):
+# Seed for the random number generators, so that test failures can be
+# reproduced
+RNG_SEED = 0xB90D
+
+
+def get_system_arrays(num_states, num_inputs, num_outputs, rng):
     eig_vals = (
-        (0.05 * np.random.random(num_states) + 0.8) +
-        1j * (0.05 * np.random.random(num_states) + 0.8))
+        (0.05 * rng.random(num_states) + 0.8) +
+        1j * (0.05 * rng.random(num_states) + 0.8))
     eig_vecs = (
-        (2. * np.random.random((num_states, num_states)) - 1.) +
-        1j * (2. * np.random.random((num_states, num_states)) - 1.))
-    A = np.linalg.inv(eig_vecs).dot(np.diag(eig_vals).dot(eig_vecs))
+        (2. * rng.random((num_states, num_states)) - 1.) +
+        1j * (2. * rng.random((num_states, num_states)) - 1.))
+    A = np.linalg.solve(eig_vecs, eig_vals[:, np.newaxis] * eig_vecs)
     B = (
-        (2. * np.random.random((num_states, num_inputs)) - 1.) +
-        1j * (2. * np.random.random((num_states, num_inputs)) - 1.))
+        (2. * rng.random((num_states, num_inputs)) - 1.) +
+        1j * (2. * rng.random((num_states, num_inputs)) - 1.))
     C = (
-        (2. * np.random.random((num_outputs, num_states)) - 1.) +
-        1j * (2. * np.random.random((num_outputs, num_states)) - 1.))
+        (2. * rng.random((num_outputs, num_states)) - 1.) +
+        1j * (2. * rng.random((num_outputs, num_states)) - 1.))
     return A, B, C
 
 
 def get_direct_impulse_response_array(A, B, num_steps):
     num_states, num_inputs = B.shape
-    direct_vecs = np.zeros((num_states, num_steps * num_inputs), dtype=A.dtype)
-    A_powers = np.identity(num_states)
-    for idx in range(num_steps):
-        direct_vecs[:, idx * num_inputs:(idx + 1) * num_inputs] =\
-            A_powers.dot(B)
-        A_powers = A_powers.dot(A)
+    dtype = np.result_type(A, B)
+    direct_vecs = np.zeros(
+        (num_states, num_steps * num_inputs), dtype=dtype, order='F')
+
+    # Each step is A times the previous one, rather than a power of A times B.
+    # The columns of a Fortran-ordered array are contiguous, so each step is
+    # written in place, as the transpose of a C-ordered product.
+    direct_vecs[:, :num_inputs] = B
+    A_T = A.T.astype(dtype)
+    for idx in range(1, num_steps):
+        np.dot(
+            direct_vecs[:, (idx - 1) * num_inputs:idx * num_inputs].T, A_T,
+            out=direct_vecs[:, idx * num_inputs:(idx + 1) * num_inputs].T)
     return direct_vecs
 
 
 def get_adjoint_impulse_response_array(A, C, num_steps, weights_array):
+    # For diagonal weights, scale by the weights directly.  Otherwise, solve
+    # with the weights once for both adjoint arrays, rather than inverting
+    # them.
     num_outputs, num_states = C.shape
-    A_adjoint = np.linalg.inv(weights_array).dot(A.conj().T.dot(weights_array))
-    C_adjoint = np.linalg.inv(weights_array).dot(C.conj().T)
-    adjoint_vecs = np.zeros((num_states, num_steps * num_outputs), dtype=A.dtype)
-    A_adjoint_powers = np.identity(num_states)
-    for idx in range(num_steps):
-        adjoint_vecs[:, (idx * num_outputs):(idx + 1) * num_outputs] =\
-            A_adjoint_powers.dot(C_adjoint)
-        A_adjoint_powers = A_adjoint_powers.dot(A_adjoint)
-    return adjoint_vecs
+    weights_diag = np.diag(weights_array)
+    if np.array_equal(weights_array, np.diag(weights_diag)):
+        A_adjoint = A.conj().T * weights_diag / weights_diag[:, np.newaxis]
+        C_adjoint = C.conj().T / weights_diag[:, np.newaxis]
+    else:
+        A_C_adjoint = np.linalg.solve(
+            weights_array,
+            np.hstack((A.conj().T.dot(weights_array), C.conj().T)))
+        A_adjoint = A_C_adjoint[:, :num_states]
+        C_adjoint = A_C_adjoint[:, num_states:]
+    return get_direct_impulse_response_array(A_adjoint, C_adjoint, num_steps)
 
 
 #@unittest.skip('Testing something else.')
 @unittest.skipIf(parallel.is_distributed(), 'Serial only.')
 class TestBPODArrays(unittest.TestCase):
     def setUp(self):
+        self.rng = np.random.default_rng(RNG_SEED)
         self.num_states = 10
         self.num_steps = self.num_states + 1
 
@@ -82,8 +100,8 @@ class TestBPODArrays(unittest.TestCase):
         # weights close to one, to avoid overly weighting certain states over
         # others.  This can dramatically affect the rate at which the tests
         # pass.
-        weights_1D = np.random.random(self.num_states)
-        weights_2D = np.identity(self.num_states, dtype=np.complex)
+        weights_1D = self.rng.random(self.num_states)
+        weights_2D = np.identity(self.num_states, dtype=complex)
         weights_2D[0, 0] = 2.
         weights_2D[2, 1] = 0.3j
         weights_2D[1, 2] = weights_2D[2, 1].conj()
@@ -91,29 +109,32 @@ class TestBPODArrays(unittest.TestCase):
         weights_array_list = [
             np.identity(self.num_states), np.diag(weights_1D), weights_2D]
 
+        # Define inner products based on weights
+        IP_list = [
+            VectorSpaceArrays(weights=weights).compute_inner_product_array
+            for weights in weights_list]
+
         # Check different system sizes.  Make sure to test a single input/output
         # in addition to multiple inputs/outputs.  Also allow for the number of
         # inputs/outputs to exceed the number of states.
-        for num_inputs in [1, np.random.randint(2, high=self.num_states + 2)]:
+        num_outputs_list = [
+            1, self.rng.integers(2, self.num_states + 2)]
+        for num_inputs in [1, self.rng.integers(2, self.num_states + 2)]:
 
-            for num_outputs in [
-                    1, np.random.randint(2, high=self.num_states + 2)]:
+            # Get state space system, with enough outputs for all the cases.
+            # The direct impulse response does not depend on the outputs, so
+            # it is only computed once for each number of inputs.
+            A, B, C_all = get_system_arrays(
+                self.num_states, num_inputs, max(num_outputs_list), self.rng)
+            direct_vecs_array = get_direct_impulse_response_array(
+                A, B, self.num_steps)
 
-                # Get state space system
-                A, B, C = get_system_arrays(
-                    self.num_states, num_inputs, num_outputs)
-
-                # Compute direct impulse response
-                direct_vecs_array = get_direct_impulse_response_array(
-                    A, B, self.num_steps)
+            for num_outputs in num_outputs_list:
+                C = C_all[:num_outputs]
 
                 # Loop through different inner product weights
-                for weights, weights_array in zip(
-                    weights_list, weights_array_list):
-
-                    # Define inner product based on weights
-                    IP = VectorSpaceArrays(
-                        weights=weights).compute_inner_product_array
+                for weights, weights_array, IP in zip(
+                    weights_list, weights_array_list, IP_list):
 
                     # Compute adjoint impulse response
                     adjoint_vecs_array = get_adjoint_impulse_response_array(
@@ -140,9 +161,20 @@ class TestBPODArrays(unittest.TestCase):
 
                     # Check Hankel array values.  These are computed fast
                     # internally by only computing the first column and last row
-                    # of chunks.  Here, simply take all the inner products.
-                    Hankel_array_slow = IP(
-                        adjoint_vecs_array, direct_vecs_array)
+                    # of chunks.  Here, simply take all the inner products, as
+                    # one weighted matrix multiplication (the weights are
+                    # Hermitian, and trans_a=2 is the conjugate transpose).
+                    # Without weights, this is a single BLAS call.
+                    if weights is None:
+                        weighted_adjoint_vecs_array = adjoint_vecs_array
+                    else:
+                        weighted_adjoint_vecs_array = weights_array.dot(
+                            adjoint_vecs_array)
+                    gemm = scipy.linalg.get_blas_funcs(
+                        'gemm', (adjoint_vecs_array, direct_vecs_array))
+                    Hankel_array_slow = gemm(
+                        1., weighted_adjoint_vecs_array, direct_vecs_array,
+                        trans_a=2)
                     np.testing.assert_allclose(
                         BPOD_res.Hankel_array, Hankel_array_slow,
                         rtol=rtol, atol=atol)
@@ -153,110 +185,122 @@ class TestBPODArrays(unittest.TestCase):
                     # and right singular vectors satisfy eigendecomposition
                     # properties with respect to the Hankel array.  Since this
                     # involves "squaring" the Hankel array, it requires more
-                    # relaxed test tolerances.
+                    # relaxed test tolerances.  The products are taken with
+                    # the thin arrays of singular vectors first, which is
+                    # cheaper than forming the squared Hankel arrays.
+                    Hankel_array_conj_T = BPOD_res.Hankel_array.conj().T
                     np.testing.assert_allclose(
                         BPOD_res.Hankel_array.dot(
-                            BPOD_res.Hankel_array.conj().T.dot(
-                                BPOD_res.L_sing_vecs)),
-                        BPOD_res.L_sing_vecs.dot(
-                            np.diag(BPOD_res.sing_vals ** 2.)),
+                            Hankel_array_conj_T.dot(BPOD_res.L_sing_vecs)),
+                        BPOD_res.L_sing_vecs * BPOD_res.sing_vals ** 2.,
                         rtol=rtol_sqr, atol=atol_sqr)
                     np.testing.assert_allclose(
-                        BPOD_res.Hankel_array.conj().T.dot(
-                            BPOD_res.Hankel_array.dot(
-                                BPOD_res.R_sing_vecs)),
-                        BPOD_res.R_sing_vecs.dot(
-                            np.diag(BPOD_res.sing_vals ** 2.)),
+                        Hankel_array_conj_T.dot(
+                            BPOD_res.Hankel_array.dot(BPOD_res.R_sing_vecs)),
+                        BPOD_res.R_sing_vecs * BPOD_res.sing_vals ** 2.,
                         rtol=rtol_sqr, atol=atol_sqr)
 
+                    # Projections onto the adjoint and direct modes,
+                    # respectively.  Since the inner products are Hermitian,
+                    # the projections of the modes onto the vecs are their
+                    # conjugate transposes.
+                    direct_proj_coeffs = IP(
+                        BPOD_res.adjoint_modes, direct_vecs_array)
+                    adjoint_proj_coeffs = IP(
+                        BPOD_res.direct_modes, adjoint_vecs_array)
+
                     # Check that the modes diagonalize the gramians.  This test
                     # requires looser tolerances than the other tests, likely
                     # due to the "squaring" of the arrays in computing the
                     # gramians.
                     np.testing.assert_allclose(
-                        IP(BPOD_res.adjoint_modes, direct_vecs_array).dot(
-                            IP(direct_vecs_array, BPOD_res.adjoint_modes)),
+                        direct_proj_coeffs.dot(direct_proj_coeffs.conj().T),
                         np.diag(BPOD_res.sing_vals),
                         rtol=rtol_sqr, atol=atol_sqr)
                     np.testing.assert_allclose(
-                        IP(BPOD_res.direct_modes, adjoint_vecs_array).dot(
-                            IP(adjoint_vecs_array, BPOD_res.direct_modes)),
+                        adjoint_proj_coeffs.dot(adjoint_proj_coeffs.conj().T),
                         np.diag(BPOD_res.sing_vals),
                         rtol=rtol_sqr, atol=atol_sqr)
 
-                    # Check the value of the projection coefficients against a
-                    # projection onto the adjoint and direct modes,
-                    # respectively.
+                    # Check the value of the projection coefficients
                     np.testing.assert_allclose(
-                        BPOD_res.direct_proj_coeffs,
-                        IP(BPOD_res.adjoint_modes, direct_vecs_array),
+                        BPOD_res.direct_proj_coeffs, direct_proj_coeffs,
                         rtol=rtol, atol=atol)
                     np.testing.assert_allclose(
-                        BPOD_res.adjoint_proj_coeffs,
-                        IP(BPOD_res.direct_modes, adjoint_vecs_array),
+                        BPOD_res.adjoint_proj_coeffs, adjoint_proj_coeffs,
                         rtol=rtol, atol=atol)
 
                     # Check that if mode indices are passed in, the correct
-                    # modes are returned.  Test both an explicit selection of
-                    # mode indices and a None argument.
-                    mode_indices_trunc = np.unique(np.random.randint(
-                        0, high=BPOD_res.sing_vals.size,
+                    # modes are returned.  (The result above already covers a
+                    # None argument, which is the default.)
+                    mode_indices_trunc = np.unique(self.rng.integers(
+                        0, BPOD_res.sing_vals.size,
                         size=(BPOD_res.sing_vals.size // 2)))
-                    for mode_indices_arg, mode_indices_vals in zip(
-                        [None, mode_indices_trunc],
-                        [range(BPOD_res.sing_vals.size), mode_indices_trunc]):
-                        BPOD_res_sliced = bpod.compute_BPOD_arrays(
-                            direct_vecs_array, adjoint_vecs_array,
-                            direct_mode_indices=mode_indices_arg,
-                            adjoint_mode_indices=mode_indices_arg,
-                            num_inputs=num_inputs, num_outputs=num_outputs,
-                            inner_product_weights=weights,
-                            rtol=rtol_svd, atol=atol_svd)
-                        np.testing.assert_allclose(
-                            BPOD_res_sliced.direct_modes,
-                            BPOD_res.direct_modes[:, mode_indices_vals],
-                            rtol=rtol, atol=atol)
-                        np.testing.assert_allclose(
-                            BPOD_res_sliced.adjoint_modes,
-                            BPOD_res.adjoint_modes[:, mode_indices_vals],
-                            rtol=rtol, atol=atol)
-
+                    BPOD_res_sliced = bpod.compute_BPOD_arrays(
+                        direct_vecs_array, adjoint_vecs_array,
+                        direct_mode_indices=mode_indices_trunc,
+                        adjoint_mode_indices=mode_indices_trunc,
+                        num_inputs=num_inputs, num_outputs=num_outputs,
+                        inner_product_weights=weights,
+                        rtol=rtol_svd, atol=atol_svd)
+                    np.testing.assert_allclose(
+                        BPOD_res_sliced.direct_modes,
+                        BPOD_res.direct_modes[:, mode_indices_trunc],
+                        rtol=rtol, atol=atol)
+                    np.testing.assert_allclose(
+                        BPOD_res_sliced.adjoint_modes,
+                        BPOD_res.adjoint_modes[:, mode_indices_trunc],
+                        rtol=rtol, atol=atol)
 
 #@unittest.skip('Testing something else.')
 class TestBPODHandles(unittest.TestCase):
     """Test the BPOD class methods """
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         # Specify output locations
         if not os.access('.', os.W_OK):
             raise RuntimeError('Cannot write to current directory')
-        self.test_dir = 'files_BPOD_DELETE_ME'
-        if not os.path.isdir(self.test_dir):
-            parallel.call_from_rank_zero(os.mkdir, self.test_dir)
-        self.direct_vec_path = join(self.test_dir, 'direct_vec_%03d.pkl')
-        self.adjoint_vec_path = join(self.test_dir, 'adjoint_vec_%03d.pkl')
-        self.direct_mode_path = join(self.test_dir, 'direct_mode_%03d.pkl')
-        self.adjoint_mode_path = join(self.test_dir, 'adjoint_mode_%03d.pkl')
+        cls.test_dir = 'files_BPOD_DELETE_ME'
+        if not os.path.isdir(cls.test_dir):
+            parallel.call_from_rank_zero(os.mkdir, cls.test_dir)
+        cls.direct_mode_path = join(cls.test_dir, 'direct_mode_%03d.pkl')
+        cls.adjoint_mode_path = join(cls.test_dir, 'adjoint_mode_%03d.pkl')
+        parallel.barrier()
 
         # Specify system dimensions.  Test single inputs/outputs as well as
         # multiple inputs/outputs.  Also allow for more inputs/outputs than
         # states.
-        self.num_states = 10
-        self.num_inputs_list = [
-            1,
-            parallel.call_and_bcast(np.random.randint, 2, self.num_states + 2)]
-        self.num_outputs_list = [
-            1,
-            parallel.call_and_bcast(np.random.randint, 2, self.num_states + 2)]
+        rng = np.random.default_rng(RNG_SEED)
+        cls.num_states = 10
+        cls.num_inputs_list = [
+            1, parallel.call_and_bcast(rng.integers, 2, cls.num_states + 2)]
+        cls.num_outputs_list = [
+            1, parallel.call_and_bcast(rng.integers, 2, cls.num_states + 2)]
 
         # Specify how long to run impulse responses
-        self.num_steps = self.num_states + 1
-
+        cls.num_steps = cls.num_states + 1
+
+        # Compute the impulse responses once, and share the handles to them
+        # (and the BPOD decompositions computed from them) between the test
+        # methods.  These are keyed by the number of inputs and outputs.
+        cls.vec_handles = {}
+        cls.decomps = {}
+        for num_inputs in cls.num_inputs_list:
+            for num_outputs in cls.num_outputs_list:
+                cls.vec_handles[(num_inputs, num_outputs)] = (
+                    cls._helper_get_impulse_response_handles(
+                        num_inputs, num_outputs, rng))
+
+
+    @classmethod
+    def tearDownClass(cls):
+        parallel.barrier()
+        parallel.call_from_rank_zero(rmtree, cls.test_dir, ignore_errors=True)
         parallel.barrier()
 
 
-    def tearDown(self):
-        parallel.barrier()
-        parallel.call_from_rank_zero(rmtree, self.test_dir, ignore_errors=True)
+    def setUp(self):
+        self.rng = np.random.default_rng(RNG_SEED)
         parallel.barrier()
 
 
@@ -322,13 +366,13 @@ class TestBPODHandles(unittest.TestCase):
         """Test that put/get work in base class."""
         # Generate some random data
         Hankel_array_true = parallel.call_and_bcast(
-            np.random.random, ((self.num_states, self.num_states)))
+            self.rng.random, ((self.num_states, self.num_states)))
         L_sing_vecs_true, sing_vals_true, R_sing_vecs_true = \
             parallel.call_and_bcast(util.svd, Hankel_array_true)
         direct_proj_coeffs_true = parallel.call_and_bcast(
-            np.random.random, ((self.num_steps, self.num_steps)))
+            self.rng.random, ((self.num_steps, self.num_steps)))
         adj_proj_coeffs_true = parallel.call_and_bcast(
-            np.random.random, ((self.num_steps, self.num_steps)))
+            self.rng.random, ((self.num_steps, self.num_steps)))
 
         # Store the data in a BPOD object
         BPOD_save = bpod.BPODHandles(verbosity=0)
@@ -370,35 +414,78 @@ class TestBPODHandles(unittest.TestCase):
 
 
     # Compute impulse responses and generate corresponding handles
-    def _helper_get_impulse_response_handles(self, num_inputs, num_outputs):
+    @classmethod
+    def _helper_get_impulse_response_handles(
+        cls, num_inputs, num_outputs, rng):
         # Get state space system
         A, B, C = parallel.call_and_bcast(
-            get_system_arrays, self.num_states, num_inputs, num_outputs)
+            get_system_arrays, cls.num_states, num_inputs, num_outputs, rng)
 
         # Run impulse responses
         direct_vec_array = parallel.call_and_bcast(
-            get_direct_impulse_response_array, A, B, self.num_steps)
+            get_direct_impulse_response_array, A, B, cls.num_steps)
         adjoint_vec_array = parallel.call_and_bcast(
-            get_adjoint_impulse_response_array, A, C, self.num_steps,
-            np.identity(self.num_states))
-
-        # Save data to disk
+            get_adjoint_impulse_response_array, A, C, cls.num_steps,
+            np.identity(cls.num_states))
+
+        # Save data to disk, in separate files for each system
+        direct_vec_path = join(
+            cls.test_dir,
+            'direct_vec_%d_%d_%%03d.pkl' % (num_inputs, num_outputs))
+        adjoint_vec_path = join(
+            cls.test_dir,
+            'adjoint_vec_%d_%d_%%03d.pkl' % (num_inputs, num_outputs))
         direct_vec_handles = [
-            VecHandlePickle(self.direct_vec_path % i)
+            VecHandlePickle(direct_vec_path % i)
             for i in range(direct_vec_array.shape[1])]
         adjoint_vec_handles = [
-            VecHandlePickle(self.adjoint_vec_path % i)
+            VecHandlePickle(adjoint_vec_path % i)
             for i in range(adjoint_vec_array.shape[1])]
+        # The arrays are Fortran-ordered, so each column is written straight
+        # from a contiguous view.
         if parallel.is_rank_zero():
-            for idx, handle in enumerate(direct_vec_handles):
-                handle.put(direct_vec_array[:, idx])
-            for idx, handle in enumerate(adjoint_vec_handles):
-                handle.put(adjoint_vec_array[:, idx])
+            for vec_handles, vec_array in [
+                (direct_vec_handles, direct_vec_array),
+                (adjoint_vec_handles, adjoint_vec_array)]:
+                for vec_handle, vec in zip(vec_handles, vec_array.T):
+                    vec_handle.put(vec)
 
         parallel.barrier()
         return direct_vec_handles, adjoint_vec_handles
 
 
+    # Create a BPOD object and compute the decomposition, reusing the result
+    # if it has already been computed for the same system
+    def _helper_compute_decomp(
+        self, direct_vec_handles, adjoint_vec_handles, num_inputs,
+        num_outputs):
+        # Use relative tolerance to avoid Hankel singular values which may
+        # correspond to very uncontrollable/unobservable states.  It is ok to
+        # use a more relaxed tolerance here than in the actual test/assert
+        # statements, as here we are saying it is ok to ignore highly
+        # uncontrollable/unobservable states, rather than allowing loose
+        # tolerances in the comparison of two numbers.  Furthermore, it is
+        # likely that in actual use, users would want to ignore relatively
+        # small Hankel singular values anyway, as that is the point of doing a
+        # balancing transformation.
+        BPOD = bpod.BPODHandles(inner_product=np.vdot, verbosity=0)
+        key = (num_inputs, num_outputs)
+        if key in self.decomps:
+            BPOD.direct_vec_handles = direct_vec_handles
+            BPOD.adjoint_vec_handles = adjoint_vec_handles
+            (BPOD.Hankel_array, BPOD.sing_vals, BPOD.L_sing_vecs,
+             BPOD.R_sing_vecs) = self.decomps[key]
+        else:
+            BPOD.compute_decomp(
+                direct_vec_handles, adjoint_vec_handles,
+                num_inputs=num_inputs, num_outputs=num_outputs,
+                rtol=1e-6, atol=1e-12)
+            self.decomps[key] = (
+                BPOD.Hankel_array, BPOD.sing_vals, BPOD.L_sing_vecs,
+                BPOD.R_sing_vecs)
+        return BPOD
+
+
     #@unittest.skip('Testing something else.')
     def test_compute_decomp(self):
         """Test that can take vecs, compute the Hankel and SVD arrays. """
@@ -417,9 +504,8 @@ class TestBPODHandles(unittest.TestCase):
             for num_outputs in self.num_outputs_list:
 
                 # Get impulse response data
-                direct_vec_handles, adjoint_vec_handles =\
-                self._helper_get_impulse_response_handles(
-                    num_inputs, num_outputs)
+                direct_vec_handles, adjoint_vec_handles = self.vec_handles[
+                    (num_inputs, num_outputs)]
 
                 # Compute BPOD using modred.
                 BPOD = bpod.BPODHandles(inner_product=np.vdot, verbosity=0)
@@ -441,18 +527,19 @@ class TestBPODHandles(unittest.TestCase):
                 # and right singular vectors satisfy eigendecomposition
                 # properties with respect to the Hankel array.  Since this
                 # involves "squaring" the Hankel array, it may require more
-                # relaxed test tolerances.
+                # relaxed test tolerances.  The products are taken with the
+                # thin arrays of singular vectors first, which is cheaper than
+                # forming the squared Hankel arrays.
+                Hankel_array_conj_T = BPOD.Hankel_array.conj().T
                 np.testing.assert_allclose(
                     BPOD.Hankel_array.dot(
-                        BPOD.Hankel_array.conj().T.dot(
-                            BPOD.L_sing_vecs)),
-                    BPOD.L_sing_vecs.dot(np.diag(BPOD.sing_vals ** 2.)),
+                        Hankel_array_conj_T.dot(BPOD.L_sing_vecs)),
+                    BPOD.L_sing_vecs * BPOD.sing_vals ** 2.,
                     rtol=rtol_sqr, atol=atol_sqr)
                 np.testing.assert_allclose(
-                    BPOD.Hankel_array.conj().T.dot(
-                        BPOD.Hankel_array.dot(
-                            BPOD.R_sing_vecs)),
-                    BPOD.R_sing_vecs.dot(np.diag(BPOD.sing_vals ** 2.)),
+                    Hankel_array_conj_T.dot(
+                        BPOD.Hankel_array.dot(BPOD.R_sing_vecs)),
+                    BPOD.R_sing_vecs * BPOD.sing_vals ** 2.,
                     rtol=rtol_sqr, atol=atol_sqr)
 
                 # Check that returned values match internal values
@@ -476,37 +563,25 @@ class TestBPODHandles(unittest.TestCase):
             for num_outputs in self.num_outputs_list:
 
                 # Get impulse response data
-                direct_vec_handles, adjoint_vec_handles =\
-                    self._helper_get_impulse_response_handles(
-                        num_inputs, num_outputs)
+                direct_vec_handles, adjoint_vec_handles = self.vec_handles[
+                    (num_inputs, num_outputs)]
 
                 # Create BPOD object and perform decomposition.  (The properties
                 # defining a BPOD mode require manipulations involving the
                 # correct decomposition, so we cannot isolate the mode
-                # computation from the decomposition step.)  Use relative
-                # tolerance to avoid Hankel singular values which may correspond
-                # to very uncontrollable/unobservable states.  It is ok to use a
-                # more relaxed tolerance here than in the actual test/assert
-                # statements, as here we are saying it is ok to ignore highly
-                # uncontrollable/unobservable states, rather than allowing loose
-                # tolerances in the comparison of two numbers.  Furthermore, it
-                # is likely that in actual use, users would want to ignore
-                # relatively small Hankel singular values anyway, as that is the
-                # point of doing a balancing transformation.
-                BPOD = bpod.BPODHandles(inner_product=np.vdot, verbosity=0)
-                BPOD.compute_decomp(
-                    direct_vec_handles, adjoint_vec_handles,
-                    num_inputs=num_inputs, num_outputs=num_outputs,
-                    rtol=1e-6, atol=1e-12)
+                # computation from the decomposition step.)
+                BPOD = self._helper_compute_decomp(
+                    direct_vec_handles, adjoint_vec_handles, num_inputs,
+                    num_outputs)
 
                 # Select a subset of modes to compute.  Compute at least half
                 # the modes, and up to all of them.  Make sure to use unique
                 # values.  (This may reduce the number of modes computed.)
                 num_modes = parallel.call_and_bcast(
-                    np.random.randint,
+                    self.rng.integers,
                     BPOD.sing_vals.size // 2, BPOD.sing_vals.size + 1)
                 mode_idxs = np.unique(parallel.call_and_bcast(
-                    np.random.randint,
+                    self.rng.integers,
                     0, BPOD.sing_vals.size, num_modes))
 
                 # Create handles for the modes
@@ -525,19 +600,24 @@ class TestBPODHandles(unittest.TestCase):
                     mode_idxs, adjoint_mode_handles,
                     adjoint_vec_handles=adjoint_vec_handles)
 
-                # Test modes against empirical gramians
-                np.testing.assert_allclose(
+                # Test modes against empirical gramians.  Since the inner
+                # product is Hermitian, the inner products of the vecs with the
+                # modes are the conjugate transposes of those of the modes with
+                # the vecs, so only the latter are computed.
+                adjoint_mode_direct_vec_IPs = \
+                    BPOD.vec_space.compute_inner_product_array(
+                        adjoint_mode_handles, direct_vec_handles)
+                direct_mode_adjoint_vec_IPs = \
                     BPOD.vec_space.compute_inner_product_array(
-                        adjoint_mode_handles, direct_vec_handles).dot(
-                            BPOD.vec_space.compute_inner_product_array(
-                                direct_vec_handles, adjoint_mode_handles)),
+                        direct_mode_handles, adjoint_vec_handles)
+                np.testing.assert_allclose(
+                    adjoint_mode_direct_vec_IPs.dot(
+                        adjoint_mode_direct_vec_IPs.conj().T),
                     np.diag(BPOD.sing_vals[mode_idxs]),
                     rtol=rtol_sqr, atol=atol_sqr)
                 np.testing.assert_allclose(
-                    BPOD.vec_space.compute_inner_product_array(
-                        direct_mode_handles, adjoint_vec_handles).dot(
-                            BPOD.vec_space.compute_inner_product_array(
-                                adjoint_vec_handles, direct_mode_handles)),
+                    direct_mode_adjoint_vec_IPs.dot(
+                        direct_mode_adjoint_vec_IPs.conj().T),
                     np.diag(BPOD.sing_vals[mode_idxs]),
                     rtol=rtol_sqr, atol=atol_sqr)
 
@@ -558,30 +638,17 @@ class TestBPODHandles(unittest.TestCase):
             for num_outputs in self.num_outputs_list:
 
                 # Get impulse response data
-                direct_vec_handles, adjoint_vec_handles =\
-                self._helper_get_impulse_response_handles(
-                    num_inputs, num_outputs)
+                direct_vec_handles, adjoint_vec_handles = self.vec_handles[
+                    (num_inputs, num_outputs)]
 
                 # Create BPOD object and compute decomposition, modes.  (The
                 # properties defining a projection onto BPOD modes require
                 # manipulations involving the correct decomposition and modes,
                 # so we cannot isolate the projection step from those
-                # computations.)  Use relative tolerance to avoid Hankel
-                # singular values which may correspond to very
-                # uncontrollable/unobservable states.  It is ok to use a
-                # more relaxed tolerance here than in the actual test/assert
-                # statements, as here we are saying it is ok to ignore
-                # highly uncontrollable/unobservable states, rather than
-                # allowing loose tolerances in the comparison of two
-                # numbers.  Furthermore, it is likely that in actual use,
-                # users would want to ignore relatively small Hankel
-                # singular values anyway, as that is the point of doing a
-                # balancing transformation.
-                BPOD = bpod.BPODHandles(inner_product=np.vdot, verbosity=0)
-                BPOD.compute_decomp(
-                    direct_vec_handles, adjoint_vec_handles,
-                    num_inputs=num_inputs, num_outputs=num_outputs,
-                    rtol=1e-6, atol=1e-12)
+                # computations.)
+                BPOD = self._helper_compute_decomp(
+                    direct_vec_handles, adjoint_vec_handles, num_inputs,
+                    num_outputs)
                 mode_idxs = range(BPOD.sing_vals.size)
                 direct_mode_handles = [
                     VecHandlePickle(self.direct_mode_path % i)
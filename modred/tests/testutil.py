@@ -175,6 +175,11 @@ class TestUtil(unittest.TestCase):
                                     abs(sing_vals[0]) / abs(sing_vals[-1])
                                     > rtol))
 
+        # Arrays with infs or NaNs are rejected by default
+        array = np.random.random((4, 3))
+        array[1, 2] = np.nan
+        self.assertRaises(ValueError, util.svd, array)
+
 
     #@unittest.skip('Testing something else.')
     @unittest.skipIf(parallel.is_distributed(), 'Only load arrays in serial')
@@ -381,6 +386,24 @@ class TestUtil(unittest.TestCase):
                     np.testing.assert_allclose(yr, y, rtol=1e-3, atol=1e-3)
 
 
+    #@unittest.skip('Testing something else.')
+    @unittest.skipIf(parallel.is_distributed(), 'Serial only.')
+    def test_impulse(self):
+        """Test impulse response outputs, including for Fortran-ordered B."""
+        num_states = 6
+        num_inputs = 3
+        num_outputs = 2
+        num_time_steps = 8
+        A, B, C = util.drss(num_states, num_inputs, num_outputs)
+        outputs_true = np.array([
+            C.dot(np.linalg.matrix_power(A, time_step)).dot(B)
+            for time_step in range(num_time_steps)])
+        for B_arg in [B, np.asfortranarray(B), B.T.copy().T]:
+            np.testing.assert_allclose(
+                util.impulse(A, B_arg, C, num_time_steps=num_time_steps),
+                outputs_true, rtol=1e-10, atol=1e-12)
+
+
     #@unittest.skip('Testing something else.')
     @unittest.skipIf(parallel.is_distributed(), 'Serial only.')
     def test_drss(self):
@@ -171,5 +171,24 @@ class TestVectors(unittest.TestCase):
         self.assertTrue(convergence < -1.9)
 
 
+    #@unittest.skip('Testing something else.')
+    def test_IP_trapz_weights(self):
+        """Test trapezoidal rule weights reproduce the inner product"""
+        rtol = 1e-10
+        atol = 1e-12
+        x_grid = np.sort(np.random.random(8))
+        y_grid = np.sort(np.random.random(5))
+        z_grid = np.sort(np.random.random(3))
+        my_trapz = vcs.InnerProductTrapz(x_grid, y_grid, z_grid)
+        v1 = (
+            np.random.random(my_trapz.grid_shape) +
+            1j * np.random.random(my_trapz.grid_shape))
+        v2 = np.random.random(my_trapz.grid_shape)
+        self.assertEqual(my_trapz.weights.shape, my_trapz.grid_shape)
+        np.testing.assert_allclose(
+            (v1.conj() * v2 * my_trapz.weights).sum(), my_trapz(v1, v2),
+            rtol=rtol, atol=atol)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -10,7 +10,8 @@ import numpy as np
 
 from modred import vectorspace as vspc, parallel, util
 from modred.py2to3 import range
-from modred.vectors import Vector, VecHandleInMemory, VecHandlePickle
+from modred.vectors import (
+    Vector, VecHandleInMemory, VecHandlePickle, InnerProductTrapz)
 
 
 #@unittest.skip('Testing other things')
@@ -112,6 +113,35 @@ class TestVectorSpaceArrays(unittest.TestCase):
                 row_array)
             np.testing.assert_allclose(
                 ip_array, ip_array_true, rtol=rtol, atol=atol)
+            np.testing.assert_allclose(
+                ip_array_symm, ip_array_symm_true, rtol=rtol, atol=atol)
+            np.testing.assert_allclose(
+                vec_space.compute_symm_inner_product_array(row_array.real),
+                row_array.real.T.dot(weights_array.dot(row_array.real)),
+                rtol=rtol, atol=atol)
+
+            # Single precision vecs are not promoted by the weights
+            ip_array_single = vec_space.compute_inner_product_array(
+                row_array.astype(np.complex64), col_array.astype(np.complex64))
+            self.assertEqual(ip_array_single.dtype, np.complex64)
+            np.testing.assert_allclose(
+                ip_array_single, ip_array_true, rtol=1e-5, atol=1e-5)
+
+            # With mixed precision vecs, the weights are not truncated to
+            # single precision, whichever side is single precision
+            row_array_single = row_array.astype(np.complex64)
+            col_array_single = col_array.astype(np.complex64)
+            for row_vecs, col_vecs in [
+                (row_array_single, col_array),
+                (row_array, col_array_single)]:
+                ip_array_mixed = vec_space.compute_inner_product_array(
+                    row_vecs, col_vecs)
+                self.assertEqual(ip_array_mixed.dtype, np.complex128)
+                np.testing.assert_allclose(
+                    ip_array_mixed,
+                    row_vecs.astype(np.complex128).conj().T.dot(
+                        weights_array.dot(col_vecs.astype(np.complex128))),
+                    rtol=rtol, atol=atol)
 
 
 #@unittest.skip('Testing other things')
@@ -138,7 +168,9 @@ class TestVectorSpaceHandles(unittest.TestCase):
             'inner_product': np.vdot, 'max_vecs_per_node': 10000,
             'max_vecs_per_proc': (
                 10000 * parallel.get_num_nodes() // parallel.get_num_procs()),
-            'verbosity': 0, 'print_interval': 10, 'prev_print_time': 0.}
+            'verbosity': 0, 'print_interval': 10, 'prev_print_time': 0.,
+            'background_io': False, 'num_threads': 1,
+            'cache_bytes': 0}
         parallel.barrier()
 
 
@@ -167,6 +199,22 @@ class TestVectorSpaceHandles(unittest.TestCase):
         self.assertEqual(util.get_data_members(vec_space), data_members)
 
 
+    #@unittest.skip('Testing other things')
+    def test_deepcopy(self):
+        """Test deep copies share the inner product but not the config."""
+        inner_product = InnerProductTrapz(np.arange(5.), np.arange(3.))
+        vec_space = vspc.VectorSpaceHandles(
+            inner_product=inner_product, max_vecs_per_node=500, verbosity=0)
+        vec_space_copy = copy.deepcopy(vec_space)
+        self.assertIs(vec_space_copy.inner_product, inner_product)
+        self.assertEqual(
+            util.get_data_members(vec_space_copy),
+            util.get_data_members(vec_space))
+        vec_space_copy.max_vecs_per_proc += 1
+        self.assertNotEqual(
+            vec_space_copy.max_vecs_per_proc, vec_space.max_vecs_per_proc)
+
+
     #@unittest.skip('Testing other things')
     def test_sanity_check(self):
         """Tests correctly checks user-supplied objects and functions."""
@@ -323,19 +371,27 @@ class TestVectorSpaceHandles(unittest.TestCase):
                         VecHandlePickle(mode_path % mode_num)
                         for mode_num in mode_idxs_vals]
 
-                    # Saves modes to files
-                    self.vec_space.lin_combine(
-                        mode_handles, vec_handles, coeff_array,
-                        coeff_array_col_indices=mode_idxs_arg)
-
-                    # Test modes one by one
-                    for mode_idx in mode_idxs_vals:
-                        computed_mode = VecHandlePickle(
-                            mode_path % mode_idx).get()
-                        np.testing.assert_allclose(
-                            computed_mode, true_modes[:, mode_idx],
-                            rtol=rtol, atol=atol)
-                    parallel.barrier()
+                    # Saves modes to files, getting and putting vecs both in
+                    # the foreground and in the background, and caching none,
+                    # some, or all of the basis vecs.
+                    vec_bytes = vec_array[:, 0].nbytes
+                    for background_io, cache_bytes in [
+                        (False, 0), (True, 0), (False, 3 * vec_bytes),
+                        (True, num_vecs * vec_bytes)]:
+                        self.vec_space.background_io = background_io
+                        self.vec_space.cache_bytes = cache_bytes
+                        self.vec_space.lin_combine(
+                            mode_handles, vec_handles, coeff_array,
+                            coeff_array_col_indices=mode_idxs_arg)
+
+                        # Test modes one by one
+                        for mode_idx in mode_idxs_vals:
+                            computed_mode = VecHandlePickle(
+                                mode_path % mode_idx).get()
+                            np.testing.assert_allclose(
+                                computed_mode, true_modes[:, mode_idx],
+                                rtol=rtol, atol=atol)
+                        parallel.barrier()
 
                 parallel.barrier()
 
@@ -404,6 +460,325 @@ class TestVectorSpaceHandles(unittest.TestCase):
                 symm_inner_product_array.dtype, row_vec_array.dtype)
 
 
+    #@unittest.skip('Testing other things')
+    def test_compute_inner_product_arrays_threads(self):
+        """Test inner products computed with multiple threads."""
+        rtol = 1e-10
+        atol = 1e-12
+        num_row_vecs = 7
+        num_col_vecs = 5
+        num_states = 6
+        row_vec_array = (
+            parallel.call_and_bcast(
+                np.random.random, (num_states, num_row_vecs)) +
+            1j * parallel.call_and_bcast(
+                np.random.random, (num_states, num_row_vecs)))
+        col_vec_array = parallel.call_and_bcast(
+            np.random.random, (num_states, num_col_vecs))
+        row_vec_handles = [
+            VecHandleInMemory(row_vec_array[:, i])
+            for i in range(num_row_vecs)]
+        col_vec_handles = [
+            VecHandleInMemory(col_vec_array[:, i])
+            for i in range(num_col_vecs)]
+
+        # Use an inner product function that is not recognized as an array
+        # inner product, so that it is called for each pair of vectors.
+        vec_space = vspc.VectorSpaceHandles(
+            inner_product=lambda vec1, vec2: np.vdot(vec1, vec2),
+            verbosity=0, num_threads=3)
+        vec_space.max_vecs_per_proc = self.max_vecs_per_proc
+        np.testing.assert_allclose(
+            vec_space.compute_inner_product_array(
+                row_vec_handles, col_vec_handles),
+            row_vec_array.conj().T.dot(col_vec_array), rtol=rtol, atol=atol)
+        np.testing.assert_allclose(
+            vec_space.compute_symm_inner_product_array(row_vec_handles),
+            row_vec_array.conj().T.dot(row_vec_array), rtol=rtol, atol=atol)
+
+
+    #@unittest.skip('Testing other things')
+    @unittest.skipIf(parallel.is_distributed(), 'Serial only.')
+    def test_compute_inner_product_arrays_trapz(self):
+        """Test inner products with trapezoidal rule weights, which are
+        computed for stacked blocks of vecs."""
+        rtol = 1e-10
+        atol = 1e-12
+        num_row_vecs = 7
+        num_col_vecs = 5
+        x_grid = np.cumsum(np.random.random(8))
+        y_grid = np.cumsum(np.random.random(4))
+
+        class InnerProductTrapzScaled(InnerProductTrapz):
+            """Overrides the inner product, which must not be bypassed."""
+            def inner_product(self, vec1, vec2):
+                return 2. * InnerProductTrapz.inner_product(self, vec1, vec2)
+
+        # The symmetric blocks are computed by scaling the vecs with the
+        # square roots of the weights.  A decreasing grid gives negative
+        # weights, for which they are computed as general blocks instead.
+        for inner_product in [
+            InnerProductTrapz(x_grid, y_grid),
+            InnerProductTrapz(x_grid[::-1], y_grid),
+            InnerProductTrapzScaled(x_grid, y_grid)]:
+            for dtype in [float, complex]:
+                row_vecs = [
+                    np.random.random(inner_product.grid_shape).astype(dtype)
+                    for i in range(num_row_vecs)]
+                col_vecs = [
+                    np.random.random(inner_product.grid_shape).astype(dtype)
+                    for i in range(num_col_vecs)]
+                if dtype is complex:
+                    row_vecs = [vec * np.exp(1j * vec) for vec in row_vecs]
+                row_vec_handles = [VecHandleInMemory(vec) for vec in row_vecs]
+                col_vec_handles = [VecHandleInMemory(vec) for vec in col_vecs]
+                IP_array_true = np.array([
+                    [inner_product(row_vec, col_vec) for col_vec in col_vecs]
+                    for row_vec in row_vecs])
+                symm_IP_array_true = np.array([
+                    [inner_product(row_vec, col_vec) for col_vec in row_vecs]
+                    for row_vec in row_vecs])
+
+                vec_space = vspc.VectorSpaceHandles(
+                    inner_product=inner_product, verbosity=0)
+                vec_space.max_vecs_per_proc = self.max_vecs_per_proc
+                np.testing.assert_allclose(
+                    vec_space.compute_inner_product_array(
+                        row_vec_handles, col_vec_handles),
+                    IP_array_true, rtol=rtol, atol=atol)
+                np.testing.assert_allclose(
+                    vec_space.compute_symm_inner_product_array(
+                        row_vec_handles),
+                    symm_IP_array_true, rtol=rtol, atol=atol)
+
+
+    #@unittest.skip('Testing other things')
+    def test_get_thread_pool(self):
+        """Test that only one shared thread pool is kept alive."""
+        pool = vspc._get_thread_pool(2)
+        self.assertIs(vspc._get_thread_pool(2), pool)
+
+        # Requesting a different number of threads shuts down the old pool
+        new_pool = vspc._get_thread_pool(3)
+        self.assertIsNot(new_pool, pool)
+        self.assertEqual(list(vspc._thread_pools.values()), [new_pool])
+        self.assertRaises(ValueError, pool.map, abs, [-1])
+        self.assertEqual(new_pool.map(abs, [-1, 2]), [1, 2])
+
+        vspc._close_thread_pools()
+        self.assertEqual(vspc._thread_pools, {})
+        self.assertRaises(ValueError, new_pool.map, abs, [-1])
+
+
+    #@unittest.skip('Testing other things')
+    @unittest.skipIf(parallel.is_distributed(), 'Serial only.')
+    def test_compute_symm_inner_product_array_num_calls(self):
+        """Test inner products are only computed once for each pair of vecs."""
+        num_vecs = 12
+        num_states = 6
+        vec_array = (
+            np.random.random((num_states, num_vecs)) +
+            1j * np.random.random((num_states, num_vecs)))
+        vec_handles = [
+            VecHandleInMemory(vec_array[:, i]) for i in range(num_vecs)]
+        for num_threads in [1, 3]:
+            num_calls = [0]
+            def counting_inner_product(vec1, vec2):
+                num_calls[0] += 1
+                return np.vdot(vec1, vec2)
+            vec_space = vspc.VectorSpaceHandles(
+                inner_product=counting_inner_product, verbosity=0,
+                num_threads=num_threads)
+            vec_space.max_vecs_per_proc = self.max_vecs_per_proc
+            np.testing.assert_allclose(
+                vec_space.compute_symm_inner_product_array(vec_handles),
+                vec_array.conj().T.dot(vec_array))
+
+            # One call per pair on or above the diagonal, plus one to get the
+            # inner product type
+            self.assertEqual(num_calls[0], num_vecs * (num_vecs + 1) // 2 + 1)
+
+
+    #@unittest.skip('Testing other things')
+    def test_add_sum_layers(self):
+        """Test stacked sum layers are accumulated, even when they cannot be
+        updated in place."""
+        basis_vecs = np.random.random((4, 3, 5))
+        coeff_array = np.random.random((4, 2))
+        sum_layers_true = np.einsum('ijk,il->ljk', basis_vecs, coeff_array)
+        for sum_layers in [
+            np.ones((2, 3, 5)), np.asfortranarray(np.ones((2, 3, 5)))]:
+            np.testing.assert_allclose(
+                self.vec_space._add_sum_layers(
+                    sum_layers, basis_vecs, coeff_array),
+                sum_layers_true + 1.)
+            np.testing.assert_allclose(sum_layers, sum_layers_true + 1.)
+
+        # The sums keep the precision of the basis vecs, as when multiplying
+        # them by scalars
+        for coeffs in [coeff_array, coeff_array * 1j]:
+            sum_layers = self.vec_space._add_sum_layers(
+                None, list(basis_vecs.astype(np.float32)), coeffs)
+            self.assertEqual(
+                sum_layers.dtype, (basis_vecs[0].astype(np.float32) *
+                coeffs[0, 0]).dtype)
+            np.testing.assert_allclose(
+                sum_layers, np.einsum('ijk,il->ljk', basis_vecs, coeffs),
+                rtol=1e-5)
+
+        # Subclasses of np.ndarray keep their type
+        sum_layers = self.vec_space._add_sum_layers(
+            None, [np.matrix(vec) for vec in basis_vecs], coeff_array)
+        for sum_layer, sum_layer_true in zip(sum_layers, sum_layers_true):
+            self.assertIsInstance(sum_layer, np.matrix)
+            np.testing.assert_allclose(sum_layer, sum_layer_true)
+
+
+    #@unittest.skip('Testing other things')
+    def test_collect_vecs(self):
+        """Test vecs are stacked into one array only when possible."""
+        vecs = [np.random.random((2, 3)) for i in range(4)]
+        vecs_array = vspc._collect_vecs(iter(vecs), len(vecs), stack=True)
+        self.assertIsInstance(vecs_array, np.ndarray)
+        self.assertTrue(vecs_array.flags.c_contiguous)
+        np.testing.assert_equal(vecs_array, np.array(vecs))
+
+        # Mixed types are promoted
+        vecs[1] = vecs[1] * 1j
+        np.testing.assert_equal(
+            vspc._collect_vecs(iter(vecs), len(vecs), stack=True),
+            np.array(vecs))
+
+        # Otherwise, a list is returned
+        for other_vec in [
+            np.random.random(6), np.matrix(np.random.random((2, 3))),
+            object()]:
+            vecs[2] = other_vec
+            vec_list = vspc._collect_vecs(iter(vecs), len(vecs), stack=True)
+            self.assertIsInstance(vec_list, list)
+            for vec, vec_true in zip(vec_list, vecs):
+                if isinstance(vec_true, np.ndarray):
+                    np.testing.assert_equal(vec, vec_true)
+                else:
+                    self.assertIs(vec, vec_true)
+        self.assertIsInstance(
+            vspc._collect_vecs(iter(vecs[:2]), 2, stack=False), list)
+
+
+    #@unittest.skip('Testing other things')
+    def test_symmetrize_upper(self):
+        """Test arrays are symmetrized using values above the diagonal."""
+        num_rows = 7
+        array = (
+            np.random.random((num_rows, num_rows)) +
+            1j * np.random.random((num_rows, num_rows)))
+
+        # Some values are only computed below the diagonal
+        array[0, 3:] = 0.
+        array[4, 6] = 0.
+        array_true = np.triu(array) + np.triu(array.conj().T, 1) * (
+            np.triu(array) == 0.)
+        array_true = np.triu(array_true) + np.triu(array_true, 1).conj().T
+        for num_rows_per_block in [1, 3, num_rows]:
+            array_symm = array.copy()
+            vspc._symmetrize_upper(
+                array_symm, num_rows_per_block=num_rows_per_block)
+            np.testing.assert_equal(array_symm, array_true)
+
+
+    #@unittest.skip('Testing other things')
+    def test_choose_num_cols_per_chunk(self):
+        """Test the number of col vecs per chunk and its effect on the inner
+        product array."""
+        for max_num_cols in [1, 10, 100, 5000]:
+            num_cols = vspc._choose_num_cols_per_chunk(max_num_cols)
+            self.assertTrue(1 <= num_cols <= max_num_cols)
+        self.assertEqual(vspc._choose_num_cols_per_chunk(5000), 1024)
+
+        num_states = 50
+        num_row_vecs = 3
+        num_col_vecs = 20
+        row_vec_array = parallel.call_and_bcast(
+            np.random.random, (num_states, num_row_vecs))
+        col_vec_array = parallel.call_and_bcast(
+            np.random.random, (num_states, num_col_vecs))
+        row_vec_handles = [
+            VecHandleInMemory(row_vec_array[:, i])
+            for i in range(num_row_vecs)]
+        col_vec_handles = [
+            VecHandleInMemory(col_vec_array[:, i])
+            for i in range(num_col_vecs)]
+        vec_space = vspc.VectorSpaceHandles(
+            inner_product=np.vdot, verbosity=0, max_vecs_per_node=100)
+
+        # The chunk size does not depend on timings, so repeated computations
+        # give identical results
+        IP_array = vec_space.compute_inner_product_array(
+            row_vec_handles, col_vec_handles)
+        np.testing.assert_equal(
+            vec_space.compute_inner_product_array(
+                row_vec_handles, col_vec_handles),
+            IP_array)
+
+        # Other chunk sizes give the same inner products, up to rounding (BLAS
+        # may sum the products in a different order for different block
+        # shapes)
+        choose_num_cols_per_chunk = vspc._choose_num_cols_per_chunk
+        try:
+            for forced_num_cols in [1, 3, 7, num_col_vecs]:
+                vspc._choose_num_cols_per_chunk = (
+                    lambda max_num_cols: min(forced_num_cols, max_num_cols))
+                np.testing.assert_allclose(
+                    vec_space.compute_inner_product_array(
+                        row_vec_handles, col_vec_handles),
+                    IP_array, rtol=1e-14, atol=0)
+        finally:
+            vspc._choose_num_cols_per_chunk = choose_num_cols_per_chunk
+
+
+    #@unittest.skip('Testing other things')
+    def test_get_num_vecs_per_send(self):
+        """Test row vecs are sent in groups that respect the memory limit."""
+        max_vecs_per_proc = 10
+        for num_rows in range(max_vecs_per_proc):
+            num_vecs_per_send = vspc._get_num_vecs_per_send(
+                max_vecs_per_proc, num_rows)
+            self.assertGreaterEqual(num_vecs_per_send, 1)
+            # The rows, the vecs being sent, and the vecs received all fit
+            if num_rows < max_vecs_per_proc - 1:
+                self.assertLessEqual(
+                    num_rows + 2 * num_vecs_per_send, max_vecs_per_proc)
+        self.assertEqual(vspc._get_num_vecs_per_send(10, 9), 1)
+        self.assertEqual(vspc._get_num_vecs_per_send(10, 2), 4)
+        self.assertEqual(
+            vspc._get_num_vecs_per_send(10, 9, min_num_vecs=3), 3)
+
+
+    #@unittest.skip('Testing other things')
+    def test_get_max_num_cols_per_chunk(self):
+        """Test col vec chunks respect the memory limit, counting all of the
+        chunks that are in memory at once."""
+        max_vecs_per_proc = 20
+        num_rows = 5
+        for background_io in [False, True]:
+            for distributed in [False, True]:
+                num_chunks = 1 + int(background_io) + int(distributed)
+                max_num_cols = vspc._get_max_num_cols_per_chunk(
+                    max_vecs_per_proc, num_rows, background_io=background_io,
+                    distributed=distributed)
+                self.assertLessEqual(
+                    num_rows + num_chunks * max_num_cols, max_vecs_per_proc)
+                self.assertGreater(
+                    num_rows + num_chunks * (max_num_cols + 1),
+                    max_vecs_per_proc)
+        self.assertEqual(vspc._get_max_num_cols_per_chunk(20, 5), 15)
+        self.assertEqual(
+            vspc._get_max_num_cols_per_chunk(20, 5, distributed=True), 7)
+        self.assertEqual(
+            vspc._get_max_num_cols_per_chunk(
+                20, 5, background_io=True, distributed=True), 5)
+
+
     #@unittest.skip('Testing other things')
     def test_compute_inner_product_arrays(self):
         """Test computation of array of inner products."""
@@ -458,20 +833,32 @@ class TestVectorSpaceHandles(unittest.TestCase):
                 if len(col_vec_handles) == 1:
                     col_vec_handles = col_vec_handles[0]
 
-                # Test ip computation.
-                product_true = np.dot(row_vec_array.conj().T, col_vec_array)
-                product_computed = self.vec_space.compute_inner_product_array(
-                    row_vec_handles, col_vec_handles)
-                np.testing.assert_allclose(
-                    product_computed, product_true, rtol=rtol, atol=atol)
-
-                # Test symm ip computation
-                product_true = np.dot(row_vec_array.conj().T, row_vec_array)
-                product_computed =\
-                    self.vec_space.compute_symm_inner_product_array(
-                        row_vec_handles)
-                np.testing.assert_allclose(
-                    product_computed, product_true, rtol=rtol, atol=atol)
+                # Getting vecs both in the foreground and in the background,
+                # and caching none, some, or all of the col vecs.
+                vec_bytes = row_vec_array[:, 0].nbytes
+                for background_io, cache_bytes in [
+                    (False, 0), (True, 0), (False, 3 * vec_bytes),
+                    (True, num_col_vecs * vec_bytes)]:
+                    self.vec_space.background_io = background_io
+                    self.vec_space.cache_bytes = cache_bytes
+
+                    # Test ip computation.
+                    product_true = np.dot(
+                        row_vec_array.conj().T, col_vec_array)
+                    product_computed =\
+                        self.vec_space.compute_inner_product_array(
+                            row_vec_handles, col_vec_handles)
+                    np.testing.assert_allclose(
+                        product_computed, product_true, rtol=rtol, atol=atol)
+
+                    # Test symm ip computation
+                    product_true = np.dot(
+                        row_vec_array.conj().T, row_vec_array)
+                    product_computed =\
+                        self.vec_space.compute_symm_inner_product_array(
+                            row_vec_handles)
+                    np.testing.assert_allclose(
+                        product_computed, product_true, rtol=rtol, atol=atol)
 
 
 if __name__=='__main__':
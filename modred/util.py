@@ -73,20 +73,26 @@ def save_array_text(array, file_name, delimiter=None):
     Files can be read in Matlab with the provided functions or often
     with Matlab's ``load``.
     """
-    # Force data to be an array
-    array = np.array(array)
+    # Force data to be an array, without copying it
+    array = np.asarray(array)
 
-    # If array is 1d, then make it into a 2d column vector
-    if array.ndim == 1:
-        array = atleast_2d_col(array)
+    # If array is 1d, then make it into a 2d column vector (a view)
+    if array.ndim < 2:
+        array = array.reshape(array.size, 1)
     elif array.ndim > 2:
         raise RuntimeError('Cannot save an array with >2 dimensions')
 
+    # Complex data is saved as pairs of floats, which requires the rows to be
+    # contiguous.  Only in that case (e.g., for a column of a C-ordered array)
+    # is the data copied.
+    if np.iscomplexobj(array):
+        array = np.ascontiguousarray(array).view(array.real.dtype)
+
     # Save data
     if delimiter is None:
-        np.savetxt(file_name, array.view(float))
+        np.savetxt(file_name, array)
     else:
-        np.savetxt(file_name, array.view(float), delimiter=delimiter)
+        np.savetxt(file_name, array, delimiter=delimiter)
 
 
 def load_array_text(file_name, delimiter=None, is_complex=False):
@@ -192,8 +198,8 @@ class InnerProductBlock(object):
         return IP_array
 
 
-def svd(array, atol=1e-13, rtol=None):
-    """Wrapper for ``numpy.linalg.svd``, computes the singular value
+def svd(array, atol=1e-13, rtol=None, check_finite=True):
+    """Wrapper for ``scipy.linalg.svd``, computes the singular value
     decomposition of an array.
 
     Args:
@@ -205,6 +211,10 @@ def svd(array, atol=1e-13, rtol=None):
         ``rtol``: Maximum relative difference between largest and smallest
         singular values.  Smaller ones are truncated.
 
+        ``check_finite``: Whether to check that ``array`` contains only finite
+        numbers.  Only skip the check if this is already known, as infs or
+        NaNs may then give an obscure error, or cause a hang.
+
     Returns:
         ``U``: Array whose columns are left singular vectors.
 
@@ -215,8 +225,12 @@ def svd(array, atol=1e-13, rtol=None):
     Truncates ``U``, ``S``, and ``V`` such that the singular values
     obey both ``atol`` and ``rtol``.
     """
-    # Compute SVD (force data to be array)
-    U, S, V_conj_T = np.linalg.svd(np.array(array), full_matrices=False)
+    # Compute SVD (force data to be array), using the divide-and-conquer
+    # driver, as in numpy.  The input is not overwritten, as callers often keep
+    # it (e.g., the Hankel array in BPOD).
+    U, S, V_conj_T = scipy.linalg.svd(
+        np.asarray(array), full_matrices=False, check_finite=check_finite,
+        lapack_driver='gesdd')
     V = V_conj_T.conj().T
 
     # Figure out how many singular values satisfy the tolerances
@@ -368,13 +382,13 @@ def balanced_truncation(
         C.transpose().conj().dot(C))
     Uc, Ec, Vc = svd(gram_cont)
     Uo, Eo, Vo = svd(gram_obsv)
-    Lc = Uc.dot(np.diag(Ec**0.5))
-    Lo = Uo.dot(np.diag(Eo**0.5))
+    Lc = Uc * Ec**0.5
+    Lo = Uo * Eo**0.5
     U, E, V = svd(Lo.transpose().dot(Lc))
     if order is None:
         order = len(E)
-    SL = Lo.dot(U[:, :order]).dot(np.diag(E[:order]**-0.5))
-    SR = Lc.dot(V[:, :order]).dot(np.diag(E[:order]**-0.5))
+    SL = Lo.dot(U[:, :order]) * E[:order]**-0.5
+    SR = Lc.dot(V[:, :order]) * E[:order]**-0.5
     A_bal_trunc = SL.transpose().dot(A).dot(SR)
     B_bal_trunc = SL.transpose().dot(B)
     C_bal_trunc = C.dot(SR)
@@ -404,7 +418,7 @@ def drss(num_states, num_inputs, num_outputs):
     eig_vals = np.linspace(.2, .95, num_states)
     eig_vecs = np.random.normal(0, 2., (num_states, num_states))
     A = np.real(
-        np.linalg.inv(eig_vecs).dot(np.diag(eig_vals).dot(eig_vecs)))
+        np.linalg.solve(eig_vecs, eig_vals[:, np.newaxis] * eig_vecs))
     B = np.random.normal(0, 1., (num_states, num_inputs))
     C = np.random.normal(0, 1., (num_outputs, num_states))
     return A, B, C
@@ -427,7 +441,7 @@ def rss(num_states, num_inputs, num_outputs):
     """
     e_vals = -np.random.random(num_states)
     transformation = np.random.random((num_states, num_states))
-    A = np.linalg.inv(transformation).dot(np.diag(e_vals)).dot(transformation)
+    A = np.linalg.solve(transformation, e_vals[:, np.newaxis] * transformation)
     B = np.random.random((num_states, num_inputs))
     C = np.random.random((num_outputs, num_states))
     return A, B, C
@@ -481,14 +495,24 @@ def impulse(A, B, C, num_time_steps=None):
     No D array is included, but one can simply be prepended to the output if
     it is non-zero.
     """
-    ss = scipy.signal.StateSpace(A, B, C, np.zeros((C.shape[0], B.shape[1])), dt=1)
-    if num_time_steps is not None:
-        dum, Markovs = scipy.signal.dimpulse(ss, n=num_time_steps+1)
-    else:
-        dum, Markovs = scipy.signal.dimpulse(ss)
-    # Remove the first element, which is 0, since we define C*B as first output
-    # of impulse response, i.e., x(0) == B.
-    Markovs = np.array(Markovs).swapaxes(0, 1).swapaxes(1, 2)[1:]
+    # Same default as scipy.signal.dimpulse, which takes 100 steps including
+    # the zero output before the impulse.
+    if num_time_steps is None:
+        num_time_steps = 99
+
+    # We define C*B as the first output of the impulse response, i.e.,
+    # x(0) == B.  The states for all inputs are advanced together, each step
+    # multiplying the previous one by A, rather than simulating each input
+    # separately.  The states alternate between two preallocated buffers, so
+    # that no temporary arrays are allocated in the loop.
+    dtype = np.result_type(A, B, C, float)
+    Markovs = np.empty((num_time_steps, C.shape[0], B.shape[1]), dtype=dtype)
+    states = np.array(B, dtype=dtype, order='C')
+    next_states = np.empty(B.shape, dtype=dtype)
+    for time_step in range(num_time_steps):
+        np.dot(C, states, out=Markovs[time_step])
+        np.dot(A, states, out=next_states)
+        states, next_states = next_states, states
     return Markovs
 
 def load_signals(signal_path, delimiter=None):
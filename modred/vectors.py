@@ -172,6 +172,18 @@ class InnerProductTrapz(object):
         self.grids = grids
         self.grid_shape = tuple(g.size for g in grids)
 
+        # The trapezoidal rule is a weighted sum of the integrand values, so
+        # store the weights.  These allow inner products of many vectors to
+        # be computed at once, as matrix multiplications.
+        self.weights = np.ones(self.grid_shape)
+        for grid_index, grid in enumerate(grids):
+            grid_weights = np.zeros(grid.size)
+            grid_weights[1:] += 0.5 * np.diff(grid)
+            grid_weights[:-1] += 0.5 * np.diff(grid)
+            weights_shape = [1] * len(grids)
+            weights_shape[grid_index] = grid.size
+            self.weights = self.weights * grid_weights.reshape(weights_shape)
+
 
     def __call__(self, vec1, vec2):
         return self.inner_product(vec1, vec2)
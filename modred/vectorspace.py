@@ -1,11 +1,254 @@
+import atexit
 import copy
+import threading
+from collections import OrderedDict
+from multiprocessing.pool import ThreadPool
 from time import time
 
 import numpy as np
+import scipy.linalg
 
 from . import parallel
 from . import util
 from .py2to3 import print_msg, range
+from .vectors import inner_product_array_uniform, InnerProductTrapz
+
+
+# Inner product functions that are known to compute the standard inner product
+# of numpy arrays, i.e., ``np.dot(vec1.conj().ravel(), vec2.ravel())``.  When
+# one of these is used, blocks of inner products can be computed with a single
+# matrix multiplication rather than one function call per pair of vectors.
+_ARRAY_INNER_PRODUCTS = (np.vdot, inner_product_array_uniform)
+
+
+# Thread pool used to call inner product functions, keyed by number of threads.
+# It is shared by all VectorSpaceHandles objects, so threads are only started
+# once and are not copied along with the objects.  At most one pool is kept:
+# it is shut down when a different number of threads is requested, and at exit.
+_thread_pools = {}
+
+
+def _close_thread_pools():
+    """Closes the shared thread pools and waits for their threads to exit."""
+    while _thread_pools:
+        _, pool = _thread_pools.popitem()
+        pool.close()
+        pool.join()
+
+
+atexit.register(_close_thread_pools)
+
+
+def _get_thread_pool(num_threads):
+    """Returns a shared pool with ``num_threads`` threads."""
+    if num_threads not in _thread_pools:
+        _close_thread_pools()
+        _thread_pools[num_threads] = ThreadPool(num_threads)
+    return _thread_pools[num_threads]
+
+
+# BLAS functions used for stacked vecs, keyed by name and data type, so that
+# each is only looked up once rather than for every block.
+_blas_funcs = {}
+
+
+def _get_blas_func(name, dtype):
+    """Returns the BLAS function ``name`` for arrays of type ``dtype``."""
+    key = (name, np.dtype(dtype))
+    if key not in _blas_funcs:
+        _blas_funcs[key] = scipy.linalg.get_blas_funcs(name, dtype=key[1])
+    return _blas_funcs[key]
+
+
+def _choose_num_cols_per_chunk(max_num_cols, max_num_cols_per_block=1024):
+    """Returns the number of col vecs per chunk, at most ``max_num_cols``, for
+    blocks of inner products computed as matrix multiplications.
+
+    Matrix multiplication is much less efficient for thin blocks than for
+    square-ish ones, so as many col vecs as fit are used, up to
+    ``max_num_cols_per_block``.  The choice depends only on the sizes, not on
+    timings, because the last bits of the inner products depend on how BLAS
+    blocks the multiplication.  This keeps results reproducible from run to
+    run.
+    """
+    return max(1, min(max_num_cols, max_num_cols_per_block))
+
+
+def _symmetrize_upper(array, num_rows_per_block=256):
+    """Makes a square array Hermitian, in place, using the values in its upper
+    triangular part.
+
+    Values above the diagonal that are zero (i.e., were not computed there)
+    are first replaced by the conjugates of the values below the diagonal.
+    The array is processed in blocks of rows, so no temporary arrays as large
+    as ``array`` are allocated.
+    """
+    num_rows = array.shape[0]
+    for start_index in range(0, num_rows, num_rows_per_block):
+        end_index = min(start_index + num_rows_per_block, num_rows)
+
+        # Rows of the upper triangle and the corresponding (conjugated)
+        # columns of the lower triangle, starting from the diagonal
+        upper = array[start_index:end_index, start_index:]
+        lower = array[start_index:, start_index:end_index].conj().T
+        missing = np.triu((upper == 0) & (lower != 0), 1)
+        upper[missing] = lower[missing]
+
+        # Fill in the lower triangle, below this block and within it
+        array[end_index:, start_index:end_index] = upper[
+            :, end_index - start_index:].conj().T
+        block = array[start_index:end_index, start_index:end_index]
+        lower_indices = np.tril_indices(end_index - start_index, -1)
+        block[lower_indices] = block.T[lower_indices].conj()
+
+
+class _BackgroundThread(threading.Thread):
+    """Thread that calls ``func(*args)``.  :py:meth:`join` returns the value
+    returned by ``func``, or re-raises any exception raised by ``func``."""
+    def __init__(self, func, *args):
+        threading.Thread.__init__(self)
+        self.func = func
+        self.args = args
+        self.result = None
+        self.error = None
+
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except Exception as error:
+            self.error = error
+
+
+    def join(self):
+        threading.Thread.join(self)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _collect_vecs(vecs, num_vecs, stack=False):
+    """Collects ``num_vecs`` vectors from the iterable ``vecs``, e.g., a
+    generator that calls ``get`` on handles.
+
+    If ``stack`` is True and the vectors are numpy arrays with the same shape,
+    returns them along the first axis of a single contiguous array, which is
+    filled as the vectors are produced so that no list of separate arrays is
+    kept.  Otherwise, returns a list of the vectors.  Instances of subclasses
+    of ``np.ndarray`` (e.g., ``np.matrix``) are not stacked, so that they keep
+    their type.
+    """
+    vecs_array = None
+    vec_list = []
+    for index, vec in enumerate(vecs):
+        if stack and index == 0 and type(vec) is np.ndarray:
+            vecs_array = np.empty((num_vecs,) + vec.shape, dtype=vec.dtype)
+        if vecs_array is not None:
+            if (
+                type(vec) is np.ndarray and
+                vec.shape == vecs_array.shape[1:]):
+                if not np.can_cast(vec.dtype, vecs_array.dtype):
+                    vecs_array = vecs_array.astype(
+                        np.result_type(vecs_array.dtype, vec.dtype))
+                vecs_array[index] = vec
+                continue
+            vec_list = list(vecs_array[:index])
+            vecs_array = None
+        vec_list.append(vec)
+    if vecs_array is not None:
+        return vecs_array
+    return vec_list
+
+
+class _VecCache(object):
+    """Least-recently-used cache of vectors retrieved from a list of handles,
+    keyed by their indices in the list.  Only numpy arrays are cached, up to a
+    total of ``max_bytes`` bytes."""
+    def __init__(self, vec_handles, max_bytes):
+        self.vec_handles = vec_handles
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self.vecs = OrderedDict()
+
+
+    def get_vec(self, index):
+        """Returns the vector with the given index, calling ``get`` on its
+        handle if it is not in the cache."""
+        if index in self.vecs:
+            # Move to the end, marking it as most recently used
+            vec = self.vecs.pop(index)
+            self.vecs[index] = vec
+        else:
+            vec = self.vec_handles[index].get()
+            if isinstance(vec, np.ndarray) and 0 < vec.nbytes <= self.max_bytes:
+                self.vecs[index] = vec
+                self.num_bytes += vec.nbytes
+                while self.num_bytes > self.max_bytes:
+                    old_vec = self.vecs.popitem(last=False)[1]
+                    self.num_bytes -= old_vec.nbytes
+        return vec
+
+
+    def get_vecs(self, indices, stack=False):
+        """Returns the vectors with the given indices, collected as by
+        :py:func:`_collect_vecs`."""
+        return _collect_vecs(
+            (self.get_vec(index) for index in indices), len(indices),
+            stack=stack)
+
+
+def _put_vecs(vec_handles, vecs):
+    """Calls ``put`` on each handle, with the corresponding vector."""
+    for vec_handle, vec in zip(vec_handles, vecs):
+        vec_handle.put(vec)
+
+
+def _stack_arrays(vecs):
+    """Returns the vectors stacked along a new first axis if they are all numpy
+    arrays with the same shape, and ``None`` otherwise."""
+    if len(vecs) == 0:
+        return None
+    for vec in vecs:
+        if not isinstance(vec, np.ndarray) or vec.shape != vecs[0].shape:
+            return None
+    return np.array(vecs)
+
+
+def _get_num_vecs_per_send(max_vecs_per_proc, num_rows, min_num_vecs=1):
+    """Returns the number of row vecs each processor sends at once when
+    passing them around the ring of processors, at least ``min_num_vecs``.
+
+    While ``num_rows`` row vecs are in memory, each processor holds both the
+    vecs it is sending (in the send buffer) and the vecs it receives, so only
+    half of the remaining memory is used for each.
+    """
+    return max(min_num_vecs, (max_vecs_per_proc - num_rows) // 2)
+
+
+def _get_max_num_cols_per_chunk(
+    max_vecs_per_proc, num_rows, background_io=False, distributed=False):
+    """Returns the largest number of col vecs each processor can retrieve at
+    once while ``num_rows`` row vecs are in memory.
+
+    The remaining memory is shared by all of the chunks of col vecs that can
+    be in memory at the same time: the one in use, the next one when it is
+    retrieved in the background, and, when running in parallel, the one
+    received from the neighboring processor while the one in use is sent.
+    """
+    num_chunks = 1 + int(background_io) + int(distributed)
+    return (max_vecs_per_proc - num_rows) // num_chunks
+
+
+def _cast_weights(weights, *vecs):
+    """Returns inner product weights with the floating point precision of
+    the arrays ``vecs`` taken together, so that weighting single precision
+    vectors does not promote them (and the matrix multiplications that
+    follow) to double precision."""
+    dtype = np.finfo(np.result_type(
+        *[v.dtype for v in vecs], np.float32)).dtype
+    if np.iscomplexobj(weights):
+        dtype = np.result_type(dtype, np.complex64)
+    return weights.astype(dtype, copy=False)
 
 
 class VectorSpaceArrays(object):
@@ -35,15 +278,33 @@ class VectorSpaceArrays(object):
 
 
     def _IP_1D_weights(self, vecs1, vecs2):
-        return np.dot(vecs1.conj().T * self.weights, vecs2)
+        return np.dot(
+            vecs1.conj().T * _cast_weights(self.weights, vecs1, vecs2), vecs2)
 
 
     def _IP_2D_weights(self, vecs1, vecs2):
-        return vecs1.conj().T.dot(self.weights.dot(vecs2))
+        return vecs1.conj().T.dot(
+            _cast_weights(self.weights, vecs1, vecs2).dot(vecs2))
 
 
     def compute_symm_inner_product_array(self, vecs):
-        return self.compute_inner_product_array(vecs, vecs)
+        # Without weights, the array is computed with a single Hermitian (or
+        # symmetric) rank-k update, which takes half the operations of a
+        # general matrix multiplication.
+        vecs = np.asarray(vecs)
+        if (self.weights is not None or vecs.ndim != 2 or
+            vecs.dtype.char not in 'fdFD'):
+            return self.compute_inner_product_array(vecs, vecs)
+
+        # The rows of vecs.T are the vectors, and herk computes the conjugates
+        # of their inner products.
+        if np.iscomplexobj(vecs):
+            IP_array = _get_blas_func('herk', vecs.dtype)(1., vecs.T)
+            np.conj(IP_array, out=IP_array)
+        else:
+            IP_array = _get_blas_func('syrk', vecs.dtype)(1., vecs.T)
+        _symmetrize_upper(IP_array)
+        return IP_array
 
 
     def lin_combine(
@@ -80,6 +341,26 @@ class VectorSpaceHandles(object):
         ``print_interval``: Minimum time (in seconds) between printed progress
         messages.
 
+        ``background_io``: If True, the next set of vectors is retrieved
+        (``get``) from a background thread while the current set is used, and
+        :py:meth:`lin_combine` calls ``put`` on each set of sum vectors from a
+        background thread while the next set is computed.  This hides time
+        spent in ``get`` and ``put``, but ``get`` and ``put`` must be safe to
+        call from a thread.  One fewer row (or sum) vector is held per
+        processor to make room for the retrieved vectors, and up to twice as
+        many sum vectors can be in memory at once.
+
+        ``cache_bytes``: Maximum number of bytes of vectors each processor
+        keeps in memory (in addition to ``max_vecs_per_node``) to avoid
+        retrieving them again when they are reused within an operation, e.g.,
+        when the column vectors of an inner product array are retrieved once
+        for each chunk of rows.  Only numpy arrays are kept.
+
+        ``num_threads``: Number of threads used to call ``inner_product`` when
+        inner products cannot be computed as matrix multiplications.  This
+        only gives a speedup if ``inner_product`` releases the global
+        interpreter lock, as numpy does for operations on large arrays.
+
     This class implements low-level functions for computing large numbers of
     vector sums and inner products.  These functions are used by high-level
     classes in :py:mod:`pod`, :py:mod:`bpod`, :py:mod:`dmd` and
@@ -92,11 +373,15 @@ class VectorSpaceHandles(object):
     """
     def __init__(
         self, inner_product=None, max_vecs_per_node=None, verbosity=1,
-        print_interval=10):
+        print_interval=10, background_io=False, num_threads=1,
+        cache_bytes=0):
         """Constructor."""
         self.inner_product = inner_product
         self.verbosity = verbosity
         self.print_interval = print_interval
+        self.background_io = background_io
+        self.num_threads = num_threads
+        self.cache_bytes = cache_bytes
         self.prev_print_time = 0.
 
         if max_vecs_per_node is None:
@@ -137,6 +422,227 @@ class VectorSpaceHandles(object):
             print_msg(msg, output_channel=output_channel)
 
 
+    def _start_get_thread(self, vec_cache, indices, stack=False):
+        """Starts getting the vectors with the given indices from ``vec_cache``
+        in a background thread, if ``background_io`` is True and there are
+        vectors to get.  Returns the thread (call ``join`` to get the vectors)
+        or ``None``."""
+        if not self.background_io or len(indices) == 0:
+            return None
+        get_thread = _BackgroundThread(
+            vec_cache.get_vecs, indices, stack)
+        get_thread.start()
+        return get_thread
+
+
+    def _is_trapz_IP(self):
+        """Returns True if ``inner_product`` is an
+        :py:class:`InnerProductTrapz` object, whose weights can be used
+        directly.  Instances of subclasses are not included, since they may
+        override how the inner product is computed."""
+        return type(self.inner_product) is InnerProductTrapz
+
+
+    def _is_array_IP(self):
+        """Returns True if ``inner_product`` is a known (possibly weighted)
+        inner product of numpy arrays, which can be computed for many vectors
+        at once using matrix multiplications."""
+        return (
+            self._is_trapz_IP() or
+            self.inner_product in _ARRAY_INNER_PRODUCTS)
+
+
+    def _stack_vecs(self, vecs):
+        """Stacks vectors into a 2D array whose rows are the flattened
+        vectors, if the inner products of these vectors can be computed as
+        matrix multiplications.  Otherwise, returns ``vecs`` unchanged.
+
+        Stacking is only done if ``inner_product`` is an array inner product
+        (see :py:meth:`_is_array_IP`) and all of the vectors are numpy arrays
+        with the same shape (the grid shape, for weighted inner products).
+        ``vecs`` may also already be stacked along the first axis of an array
+        (see :py:func:`_collect_vecs`), which is then flattened without
+        copying.
+        """
+        if not self._is_array_IP():
+            return vecs
+        if isinstance(vecs, np.ndarray):
+            vecs_array = vecs
+        else:
+            vecs_array = _stack_arrays(vecs)
+            if vecs_array is None:
+                return vecs
+        if self._is_trapz_IP():
+            grid_shape = self.inner_product.grid_shape
+            if vecs_array.shape[1:] not in [
+                grid_shape, (int(np.prod(grid_shape)),)]:
+                return list(vecs_array)
+        return vecs_array.reshape(len(vecs_array), -1)
+
+
+    def _compute_IP_block(self, row_vecs, col_vecs):
+        """Computes 2D array of inner products of ``row_vecs`` with
+        ``col_vecs``.
+
+        If both sets of vectors can be stacked (see :py:meth:`_stack_vecs`),
+        the whole block is computed with one (weighted) matrix multiplication.
+        Otherwise, ``inner_product`` is called for each pair of vectors, with
+        the rows divided among ``num_threads`` threads.
+
+        The row vectors are held in memory for many calls, while there are
+        usually only a few column vectors.  Thus the conjugation and weighting
+        are applied to the column vectors and the result, using the identity
+        :math:`X^* W Y = (X^T (W Y^*))^*` for real :math:`W`, so that no
+        temporary copies of the row vectors are made.
+        """
+        row_vecs = self._stack_vecs(row_vecs)
+        col_vecs = self._stack_vecs(col_vecs)
+        if (
+            isinstance(row_vecs, np.ndarray) and
+            isinstance(col_vecs, np.ndarray)):
+            col_vecs = col_vecs.conj()
+            if self._is_trapz_IP():
+                col_vecs = col_vecs * _cast_weights(
+                    self.inner_product.weights.ravel(), row_vecs, col_vecs)
+            return row_vecs.dot(col_vecs.T).conj()
+
+        def compute_IP_row(row_vec):
+            return [
+                self.inner_product(row_vec, col_vec) for col_vec in col_vecs]
+
+        if self.num_threads > 1 and len(row_vecs) > 1:
+            return np.array(_get_thread_pool(self.num_threads).map(
+                compute_IP_row, row_vecs))
+        return np.array([compute_IP_row(row_vec) for row_vec in row_vecs])
+
+
+    def _compute_symm_IP_block(self, vecs):
+        """Computes the upper triangular part of the 2D array of inner
+        products of ``vecs`` with themselves.
+
+        If the vectors can be stacked (see :py:meth:`_stack_vecs`), the block
+        is computed with a single symmetric (or Hermitian) rank-k update, which
+        takes half the operations of a general matrix multiplication.  This
+        requires non-negative weights, which are absorbed into the vectors by
+        scaling with their square roots.
+        """
+        vecs = self._stack_vecs(vecs)
+        if not isinstance(vecs, np.ndarray):
+            return self._compute_upper_IP_pairs(vecs)
+        if self._is_trapz_IP():
+            weights = self.inner_product.weights.ravel()
+            if (weights < 0).any():
+                return np.triu(self._compute_IP_block(vecs, vecs))
+            vecs = vecs * np.sqrt(_cast_weights(weights, vecs))
+        # The transpose of the stacked rows is Fortran-ordered, so it is
+        # passed to BLAS without being copied.
+        if np.iscomplexobj(vecs):
+            herk = _get_blas_func('herk', vecs.dtype)
+            return np.triu(herk(1., vecs.T, trans=2))
+        syrk = _get_blas_func('syrk', vecs.dtype)
+        return np.triu(syrk(1., vecs.T, trans=1))
+
+
+    def _compute_upper_IP_pairs(self, vecs):
+        """Computes the upper triangular part of the 2D array of inner
+        products of ``vecs`` with themselves, calling ``inner_product`` only
+        for the pairs on and above the diagonal.
+
+        The rows are divided among ``num_threads`` threads, as in
+        :py:meth:`_compute_IP_block`.
+        """
+        num_vecs = len(vecs)
+
+        def compute_IP_row(row_index):
+            return [
+                self.inner_product(vecs[row_index], vecs[col_index])
+                for col_index in range(row_index, num_vecs)]
+
+        if self.num_threads > 1 and num_vecs > 1:
+            IP_rows = _get_thread_pool(self.num_threads).map(
+                compute_IP_row, range(num_vecs))
+        else:
+            IP_rows = [
+                compute_IP_row(row_index) for row_index in range(num_vecs)]
+
+        # The rows of the upper triangle, concatenated, are in the same order
+        # as the indices returned by np.triu_indices.
+        IPs = np.array([IP for IP_row in IP_rows for IP in IP_row])
+        IP_block = np.zeros((num_vecs, num_vecs), dtype=IPs.dtype)
+        IP_block[np.triu_indices(num_vecs)] = IPs
+        return IP_block
+
+
+    def _add_sum_layers(self, sum_layers, basis_vecs, coeff_array):
+        """Adds linear combinations of ``basis_vecs`` to ``sum_layers``.
+
+        Args:
+            ``sum_layers``: Partial sums, one for each column of
+            ``coeff_array``, or ``None`` if no sums have been started yet.
+
+            ``basis_vecs``: List of basis vector objects, or numpy arrays
+            stacked along the first axis of an array.
+
+            ``coeff_array``: 2D array whose rows correspond to ``basis_vecs``
+            and whose columns correspond to ``sum_layers``.
+
+        Returns:
+            ``sum_layers``: Updated partial sums.
+
+        If the basis vectors are numpy arrays with the same shape, the layers
+        are stored along the first axis of a single array and are accumulated
+        in place by one matrix multiplication (BLAS ``gemm`` with ``beta=1``),
+        so no temporary layers are allocated.  Otherwise (including for
+        subclasses of ``np.ndarray``, which keep their type), the addition and
+        scalar multiplication of the vector objects are used.
+        """
+        if isinstance(basis_vecs, np.ndarray):
+            basis_array = basis_vecs
+        elif all(type(vec) is np.ndarray for vec in basis_vecs):
+            basis_array = _stack_arrays(basis_vecs)
+        else:
+            basis_array = None
+        if basis_array is not None and (
+            sum_layers is None or isinstance(sum_layers, np.ndarray)):
+            # As when multiplying an array by a scalar, the sums keep the
+            # precision of the basis vectors, whatever that of the coeffs.
+            dtype = np.result_type(
+                basis_array.dtype, 1j if np.iscomplexobj(coeff_array) else 1.)
+            if sum_layers is None:
+                sum_layers = np.zeros(
+                    (coeff_array.shape[1],) + basis_array.shape[1:],
+                    dtype=dtype)
+            elif not np.can_cast(dtype, sum_layers.dtype):
+                sum_layers = sum_layers.astype(dtype)
+
+            # The transpose of the C-ordered layers is Fortran-ordered, so it
+            # can be updated in place by gemm.  Otherwise (e.g., if the layers
+            # are not contiguous), gemm works on a copy, which is written back.
+            gemm = _get_blas_func('gemm', sum_layers.dtype)
+            updated_layers = gemm(
+                1., basis_array.reshape(len(basis_vecs), -1).T.astype(
+                    sum_layers.dtype, copy=False),
+                coeff_array.astype(sum_layers.dtype, copy=False),
+                beta=1., c=sum_layers.reshape(len(sum_layers), -1).T,
+                overwrite_c=True)
+            if not np.may_share_memory(updated_layers, sum_layers):
+                sum_layers[...] = updated_layers.T.reshape(sum_layers.shape)
+            return sum_layers
+
+        # Loop over the basis vectors first, so that each is used for all of
+        # the sums while it is in cache.
+        if sum_layers is None:
+            sum_layers = [None] * coeff_array.shape[1]
+        for basis_index, basis_vec in enumerate(basis_vecs):
+            for sum_index in range(coeff_array.shape[1]):
+                sum_layer = basis_vec * coeff_array[basis_index, sum_index]
+                if sum_layers[sum_index] is None:
+                    sum_layers[sum_index] = sum_layer
+                else:
+                    sum_layers[sum_index] += sum_layer
+        return sum_layers
+
+
     def sanity_check(self, test_vec_handle):
         """Checks that user-supplied vector handle and vector satisfy
         requirements.
@@ -161,14 +667,22 @@ class VectorSpaceHandles(object):
         # Generate some data
         test_vec = test_vec_handle.get()
 
-        # Copy vector for comparisons before doing anything else, to later check
-        # if other operations change the internal data.
-        vec_copy = copy.deepcopy(test_vec)
-        vec_copy_mag_sq = self.inner_product(vec_copy, vec_copy)
+        # Compute the magnitude before doing anything else, to later check if
+        # other operations change the internal data.  (Only the magnitude is
+        # compared, so there is no need to copy the whole vector.)
+        vec_copy_mag_sq = self.inner_product(test_vec, test_vec)
 
-        # Check that inner product of scaled vector is correct
+        # Check that scalar multiplication doesn't return the original vector,
+        # i.e., that it isn't done in place.  (Whether the operations change
+        # the original vector in other ways is checked once at the end, rather
+        # than after each operation, to save inner products of large vectors.)
         scale_factor = 2.
         vec_mult = test_vec * scale_factor
+        if vec_mult is test_vec:
+            raise ValueError(
+                'Scalar multiplication changes the original test vector.')
+
+        # Check that inner product of scaled vector is correct
         if abs(
             self.inner_product(vec_mult, vec_mult) -
             vec_copy_mag_sq * scale_factor ** 2) > tol:
@@ -176,29 +690,19 @@ class VectorSpaceHandles(object):
                 'Inner product of vector with itself is incorrect after scalar '
                 'multiplication.')
 
-        # Check that inner product of original vector hasn't changed due to
-        # scalar multiplication.
-        if abs(
-            self.inner_product(test_vec, test_vec) - vec_copy_mag_sq) > tol:
+        # Check that vector addition isn't done in place
+        vec_add = test_vec + test_vec
+        if vec_add is test_vec:
             raise ValueError(
-                'Inner product of original test vector with itself has changed '
-                'value after scalar multiplication.')
+                'Vector addition changes the original test vector.')
 
         # Check that the inner product of a summed vector is correct
-        vec_add = test_vec + test_vec
         if abs(
             self.inner_product(vec_add, vec_add) - vec_copy_mag_sq * 4) > tol:
             raise ValueError(
                 'Inner product of vector with itself is incorrect after '
                 'vector addition.')
 
-        # Check that inner product of original vector hasn't changed due to
-        # vector addition.
-        if abs(self.inner_product(test_vec, test_vec) - vec_copy_mag_sq) > tol:
-            raise ValueError(
-                'Inner product of original test vector with itself has changed '
-                'value after vector addition.')
-
         # Check that the inner product of a vector is correct after scalar
         # multiplication and vector addition.
         vec_add_mult = test_vec * scale_factor + test_vec
@@ -210,11 +714,11 @@ class VectorSpaceHandles(object):
                 'multiplication and vector addition.')
 
         # Check that inner product of original vector hasn't changed due to
-        # scalar multiplication and vector addition.
+        # any of the scalar multiplications and vector additions.
         if abs(self.inner_product(test_vec, test_vec) - vec_copy_mag_sq) > tol:
             raise ValueError(
                 'Inner product of original test vector with itself has changed '
-                'value after scalar multiplication and vector addition.')
+                'value after scalar multiplication or vector addition.')
 
         # Report results to user
         self.print_msg('Passed the sanity check.')
@@ -282,9 +786,9 @@ class VectorSpaceHandles(object):
         ``max_vecs_per_proc = max_vecs_per_node/num_procs_per_node``,
         and :math:`n_p` is the number of MPI workers (processors).
 
-        If there are more rows than columns, then an internal transpose and
-        un-transpose is performed to improve efficiency (since :math:`n_c` only
-        appears in the scaling in the quadratic term).
+        If there are more rows than columns, then the roles of the rows and
+        columns are swapped internally to improve efficiency (since :math:`n_c`
+        only appears in the scaling in the quadratic term).
         """
         self._check_inner_product()
         row_vec_handles = util.make_iterable(row_vec_handles)
@@ -293,25 +797,22 @@ class VectorSpaceHandles(object):
         num_cols = len(col_vec_handles)
         num_rows = len(row_vec_handles)
 
-        if num_rows > num_cols:
-            transpose = True
-            tmp = row_vec_handles
-            row_vec_handles = col_vec_handles
-            col_vec_handles = tmp
-            tmp = num_rows
-            num_rows = num_cols
-            num_cols = tmp
-        else:
-            transpose = False
+        transpose = num_rows > num_cols
+        if transpose:
+            row_vec_handles, col_vec_handles = col_vec_handles, row_vec_handles
+            num_rows, num_cols = num_cols, num_rows
 
         # convenience
         rank = parallel.get_rank()
 
         ## Old way that worked
-        # num_cols_per_proc_chunk is the number of cols each proc gets at once
+        # num_cols_per_proc_chunk is the number of cols each proc gets at once.
+        # When getting in the background, leave room for the next cols too.
         num_cols_per_proc_chunk = 1
         num_rows_per_proc_chunk = (
             self.max_vecs_per_proc - num_cols_per_proc_chunk)
+        if self.background_io:
+            num_rows_per_proc_chunk -= num_cols_per_proc_chunk
 
         ## New way
         #if self.max_vecs_per_node > max_num_row_tasks:
@@ -340,37 +841,57 @@ class VectorSpaceHandles(object):
                 'number of nodes or max_vecs_per_node to reduce redundant '
                 'gets for a speedup.') % (num_cols, num_row_get_loops))
 
-        # Burn the first inner product, it sometimes contains slow imports
+        # Get the inner product type (real or complex).  This also burns the
+        # first inner product, which sometimes contains slow imports.
         row_vec = row_vec_handles[0].get()
         col_vec = col_vec_handles[0].get()
-        IP_burn = self.inner_product(row_vec, col_vec)
+        IP_type = type(self.inner_product(row_vec, col_vec))
 
-        # Time the get method
-        start_time = time()
-        row_vec = row_vec_handles[0].get()
-        get_time = time() - start_time
-
-        # Time the inner product method and get inner product type (real or
-        # complex)
-        start_time = time()
-        IP = self.inner_product(row_vec, col_vec)
-        IP_time = time() - start_time
-        IP_type = type(IP)
-
-        # Estimate time to compute entire inner product array
-        total_IP_time = (
-            num_rows * num_cols * IP_time / parallel.get_num_procs())
-        vecs_per_proc = (
-            self.max_vecs_per_node * parallel.get_num_nodes() /
-            parallel.get_num_procs())
-        num_gets =  (
-            num_rows * num_cols /
-            ((vecs_per_proc - 2) * parallel.get_num_procs() ** 2) +
-            num_rows / parallel.get_num_procs())
-        total_get_time = num_gets * get_time
-        self.print_msg((
-            'Computing the inner product array will take at least %.1f '
-            'minutes.') % ((total_IP_time + total_get_time) / 60.))
+        # Timing requires extra gets and inner products, so only do it if the
+        # estimate will be printed.
+        if self.verbosity > 0 and parallel.is_rank_zero():
+            # Time the get method
+            start_time = time()
+            row_vec = row_vec_handles[0].get()
+            get_time = time() - start_time
+
+            # Time the inner product method
+            start_time = time()
+            IP = self.inner_product(row_vec, col_vec)
+            IP_time = time() - start_time
+
+            # Estimate time to compute entire inner product array
+            total_IP_time = (
+                num_rows * num_cols * IP_time / parallel.get_num_procs())
+            vecs_per_proc = (
+                self.max_vecs_per_node * parallel.get_num_nodes() /
+                parallel.get_num_procs())
+            num_gets =  (
+                num_rows * num_cols /
+                ((vecs_per_proc - 2) * parallel.get_num_procs() ** 2) +
+                num_rows / parallel.get_num_procs())
+            total_get_time = num_gets * get_time
+            self.print_msg((
+                'Computing the inner product array will take at least %.1f '
+                'minutes.') % ((total_IP_time + total_get_time) / 60.))
+
+        # If all of the row vecs fit in memory at once, each col vec is only
+        # retrieved once no matter how many are retrieved at a time.  In that
+        # case, use the spare memory for more col vecs at a time, which makes
+        # the stacked inner products faster.
+        max_num_cols_per_proc_chunk = min(
+            _get_max_num_cols_per_chunk(
+                self.max_vecs_per_proc, max_num_row_tasks,
+                background_io=self.background_io,
+                distributed=parallel.is_distributed()),
+            max_num_col_tasks)
+        if (
+            self._is_array_IP() and isinstance(row_vec, np.ndarray) and
+            max_num_cols_per_proc_chunk > 1):
+            num_cols_per_proc_chunk = _choose_num_cols_per_chunk(
+                max_num_cols_per_proc_chunk)
+            num_col_get_loops = int(np.ceil(
+                max_num_col_tasks * 1. / num_cols_per_proc_chunk))
         del row_vec, col_vec
 
         # To find all of the inner product array chunks, each
@@ -382,7 +903,35 @@ class VectorSpaceHandles(object):
         # concatenating chunks of the IP_arrays.
         # The efficiency is not an issue; the size of the arrays
         # are small compared to the size of the vecs for large data.
-        IP_array = np.zeros((num_rows, num_cols), dtype=IP_type)
+        # If the rows and cols were swapped, the conjugated inner products are
+        # filled into a transposed view of the array, so that the array
+        # returned is not a transposed copy.
+        if transpose:
+            IP_array = np.zeros((num_cols, num_rows), dtype=IP_type)
+            IP_array_view = IP_array.T
+        else:
+            IP_array = np.zeros((num_rows, num_cols), dtype=IP_type)
+            IP_array_view = IP_array
+
+        # Find the range of col indices this proc gets in each iteration of
+        # the col get loop.
+        col_get_ranges = []
+        for col_get_index in range(num_col_get_loops):
+            if len(col_tasks[rank]) > 0:
+                start_col_index = min(
+                    col_tasks[rank][0] + (
+                        col_get_index * num_cols_per_proc_chunk),
+                    col_tasks[rank][-1] + 1)
+                end_col_index = min(
+                    col_tasks[rank][-1] + 1,
+                    start_col_index + num_cols_per_proc_chunk)
+            else:
+                start_col_index = 0
+                end_col_index = 0
+            col_get_ranges.append((start_col_index, end_col_index))
+
+        # The col vecs are retrieved once per row get loop, so cache them
+        col_vec_cache = _VecCache(col_vec_handles, self.cache_bytes)
         for row_get_index in range(num_row_get_loops):
             if len(row_tasks[rank]) > 0:
                 start_row_index = min(
@@ -392,24 +941,17 @@ class VectorSpaceHandles(object):
                 end_row_index = min(
                     row_tasks[rank][-1] + 1,
                     start_row_index + num_rows_per_proc_chunk)
-                row_vecs = [
-                    row_vec_handle.get() for row_vec_handle in
-                    row_vec_handles[start_row_index:end_row_index]]
+                row_vecs = self._stack_vecs(_collect_vecs(
+                    (row_vec_handle.get() for row_vec_handle in
+                    row_vec_handles[start_row_index:end_row_index]),
+                    end_row_index - start_row_index,
+                    stack=self._is_array_IP()))
             else:
                 row_vecs = []
 
+            get_thread = None
             for col_get_index in range(num_col_get_loops):
-                if len(col_tasks[rank]) > 0:
-                    start_col_index = min(
-                        col_tasks[rank][0] + (
-                            col_get_index * num_cols_per_proc_chunk),
-                        col_tasks[rank][-1] + 1)
-                    end_col_index = min(
-                        col_tasks[rank][-1] + 1,
-                        start_col_index + num_cols_per_proc_chunk)
-                else:
-                    start_col_index = 0
-                    end_col_index = 0
+                start_col_index, end_col_index = col_get_ranges[col_get_index]
 
                 # Cycle the col vecs to proc with rank -> mod(rank+1,num_procs)
                 # Must do this for each processor, until data makes a circle
@@ -419,10 +961,19 @@ class VectorSpaceHandles(object):
                     # If on the first pass, get the col vecs, no send/recv
                     # This is all that is called when in serial, loop iterates
                     # once.
+                    # In the background, get the col vecs for the next
+                    # iteration while these ones are used.
                     if pass_index == 0:
-                        col_vecs = [
-                            col_handle.get() for col_handle in
-                            col_vec_handles[start_col_index:end_col_index]]
+                        if get_thread is not None:
+                            col_vecs = get_thread.join()
+                        else:
+                            col_vecs = col_vec_cache.get_vecs(
+                                col_indices, stack=self._is_array_IP())
+                        if col_get_index + 1 < num_col_get_loops:
+                            get_thread = self._start_get_thread(
+                                col_vec_cache, list(range(
+                                    *col_get_ranges[col_get_index + 1])),
+                                stack=self._is_array_IP())
                     else:
                         # Determine with whom to communicate
                         dest = (rank + 1) % parallel.get_num_procs()
@@ -447,15 +998,14 @@ class VectorSpaceHandles(object):
 
                     # Compute the IPs for this set of data col_indices stores
                     # the indices of the IP_array columns to be filled in.
+                    if len(row_vecs) > 0 and len(col_vecs) > 0:
+                        IP_block = self._compute_IP_block(row_vecs, col_vecs)
+                        if transpose:
+                            IP_block = IP_block.conj()
+                        IP_array_view[
+                            start_row_index:end_row_index, col_indices
+                        ] = IP_block
                     if len(row_vecs) > 0:
-                        for row_index in range(start_row_index, end_row_index):
-                            for col_vec_index, col_vec in enumerate(col_vecs):
-                                IP_array[
-                                    row_index,
-                                    col_indices[col_vec_index]
-                                ] = self.inner_product(
-                                    row_vecs[row_index - start_row_index],
-                                    col_vec)
                         if (
                             (time() - self.prev_print_time) >
                             self.print_interval):
@@ -480,9 +1030,6 @@ class VectorSpaceHandles(object):
         if parallel.is_distributed():
             IP_array = parallel.custom_comm.allreduce(IP_array)
 
-        if transpose:
-            IP_array = IP_array.conj().T
-
         percent_completed_IPs = 100.
         self.print_msg(
             'Completed 100% of inner products', output_channel='stderr')
@@ -527,6 +1074,8 @@ class VectorSpaceHandles(object):
         num_cols_per_proc_chunk = 1
         num_rows_per_proc_chunk = (
             self.max_vecs_per_proc - num_cols_per_proc_chunk)
+        if self.background_io:
+            num_rows_per_proc_chunk -= num_cols_per_proc_chunk
 
         # <nprocs> chunks are computed simulaneously, making up a set.
         num_cols_per_chunk = num_cols_per_proc_chunk * parallel.get_num_procs()
@@ -541,36 +1090,38 @@ class VectorSpaceHandles(object):
                 'to reduce redundant gets for a speedup.') %
                 (num_vecs,num_row_chunks))
 
-        # Burn the first inner product, as it sometimes contains slow imports
+        # Get the inner product type (real or complex).  This also burns the
+        # first inner product, which sometimes contains slow imports.
         test_vec = vec_handles[0].get()
-        IP_burn = self.inner_product(test_vec, test_vec)
+        IP_type = type(self.inner_product(test_vec, test_vec))
 
-        # Time the get method
-        start_time = time()
-        test_vec = vec_handles[0].get()
-        get_time = time() - start_time
-
-        # Time the inner product method and determine the inner product type
-        # (real or complex)
-        start_time = time()
-        IP = self.inner_product(test_vec, test_vec)
-        IP_time = time() - start_time
-        IP_type = type(IP)
-
-        # Estimate the time to compute the total inner product array
-        total_IP_time = (
-            num_vecs ** 2 * IP_time / 2. / parallel.get_num_procs())
-        vecs_per_proc = (
-            self.max_vecs_per_node * parallel.get_num_nodes() /
-            parallel.get_num_procs())
-        num_gets =  (
-            (num_vecs ** 2 / 2.) / ((vecs_per_proc - 2) *
-            parallel.get_num_procs() ** 2) +
-            num_vecs / parallel.get_num_procs() / 2.)
-        total_get_time = num_gets * get_time
-        self.print_msg((
-            'Computing the inner product array will take at least %.1f '
-            'minutes' % ((total_IP_time + total_get_time) / 60.)))
+        # Timing requires extra gets and inner products, so only do it if the
+        # estimate will be printed.
+        if self.verbosity > 0 and parallel.is_rank_zero():
+            # Time the get method
+            start_time = time()
+            test_vec = vec_handles[0].get()
+            get_time = time() - start_time
+
+            # Time the inner product method
+            start_time = time()
+            IP = self.inner_product(test_vec, test_vec)
+            IP_time = time() - start_time
+
+            # Estimate the time to compute the total inner product array
+            total_IP_time = (
+                num_vecs ** 2 * IP_time / 2. / parallel.get_num_procs())
+            vecs_per_proc = (
+                self.max_vecs_per_node * parallel.get_num_nodes() /
+                parallel.get_num_procs())
+            num_gets =  (
+                (num_vecs ** 2 / 2.) / ((vecs_per_proc - 2) *
+                parallel.get_num_procs() ** 2) +
+                num_vecs / parallel.get_num_procs() / 2.)
+            total_get_time = num_gets * get_time
+            self.print_msg((
+                'Computing the inner product array will take at least %.1f '
+                'minutes' % ((total_IP_time + total_get_time) / 60.)))
         del test_vec
 
         # Use the same trick as in compute_IP_array, having each proc
@@ -579,6 +1130,10 @@ class VectorSpaceHandles(object):
         # For the rectangular portions, the inner product array is filled
         # in directly.
         IP_array = np.zeros((num_vecs, num_vecs), dtype=IP_type)
+
+        # The col vecs of the rectangular portions are retrieved once per row
+        # chunk, so cache them
+        col_vec_cache = _VecCache(vec_handles, self.cache_bytes)
         for start_row_index in range(0, num_vecs, num_rows_per_chunk):
             end_row_index = min(num_vecs, start_row_index + num_rows_per_chunk)
             proc_row_tasks_all = parallel.find_assignments(list(range(
@@ -587,9 +1142,10 @@ class VectorSpaceHandles(object):
                 task for task in proc_row_tasks_all if task != []])
             proc_row_tasks = proc_row_tasks_all[parallel.get_rank()]
             if len(proc_row_tasks)!=0:
-                row_vecs = [
-                    vec_handle.get() for vec_handle in
-                    vec_handles[proc_row_tasks[0]:proc_row_tasks[-1] + 1]]
+                row_vecs = self._stack_vecs(_collect_vecs(
+                    (vec_handle.get() for vec_handle in
+                    vec_handles[proc_row_tasks[0]:proc_row_tasks[-1] + 1]),
+                    len(proc_row_tasks), stack=self._is_array_IP()))
             else:
                 row_vecs = []
 
@@ -601,19 +1157,19 @@ class VectorSpaceHandles(object):
                     raise ValueError('Indices are not consecutive.')
 
                 # Per-processor triangles (using only vecs in memory)
-                for row_index in range(proc_row_tasks[0],
-                    proc_row_tasks[-1] + 1):
-                    # Diagonal term
-                    IP_array[row_index, row_index] = self.inner_product(
-                        row_vecs[row_index - proc_row_tasks[0]],
-                        row_vecs[row_index - proc_row_tasks[0]])
-
-                    # Off-diagonal terms
-                    for col_index in range(
-                        row_index + 1, proc_row_tasks[-1] + 1):
-                        IP_array[row_index, col_index] = self.inner_product(
-                            row_vecs[row_index - proc_row_tasks[0]],
-                            row_vecs[col_index - proc_row_tasks[0]])
+                IP_array[
+                    proc_row_tasks[0]:proc_row_tasks[-1] + 1,
+                    proc_row_tasks[0]:proc_row_tasks[-1] + 1
+                ] = self._compute_symm_IP_block(row_vecs)
+
+            # Row vecs are sent to other procs, where they become cols, in
+            # groups that fit in memory alongside the rows already there.
+            # Sending as many as possible at once reduces the number of
+            # messages and barriers, and gives larger matrix multiplications.
+            max_num_rows = max([len(tasks) for tasks in proc_row_tasks_all])
+            num_vecs_per_send = _get_num_vecs_per_send(
+                self.max_vecs_per_proc, max_num_rows,
+                min_num_vecs=num_cols_per_proc_chunk)
 
             # Number of square chunks to fill in is n * (n-1) / 2.  At each
             # iteration we fill in n of them, so we need (n-1) / 2
@@ -631,9 +1187,8 @@ class VectorSpaceHandles(object):
                 source_rank = (my_rank - set_index - 1) % num_active_procs
 
                 # Find the maximum number of sends/recv to be done by any proc
-                max_num_to_send = int(np.ceil(1. * max([len(tasks) for \
-                    tasks in proc_row_tasks_all]) /\
-                    num_cols_per_proc_chunk))
+                max_num_to_send = int(np.ceil(
+                    1. * max_num_rows / num_vecs_per_send))
                 '''
                 # Pad tasks with nan so that everyone has the same
                 # number of things to send.  Same for list of vecs with None.
@@ -650,12 +1205,11 @@ class VectorSpaceHandles(object):
                 for send_index in range(max_num_to_send):
                     # Only processors responsible for rows communicate
                     if my_num_rows > 0:
-                        # Send row vecs, in groups of num_cols_per_proc_chunk
+                        # Send row vecs, in groups of num_vecs_per_send
                         # These become columns in the ensuing computation
-                        start_col_index = send_index * num_cols_per_proc_chunk
+                        start_col_index = send_index * num_vecs_per_send
                         end_col_index = min(
-                            start_col_index + num_cols_per_proc_chunk,
-                            my_num_rows)
+                            start_col_index + num_vecs_per_send, my_num_rows)
                         col_vecs_send = (
                             row_vecs[start_col_index:end_col_index],
                             my_row_indices[start_col_index:end_col_index])
@@ -678,29 +1232,25 @@ class VectorSpaceHandles(object):
                         col_vecs = col_vecs_recv[0]
                         my_col_indices = col_vecs_recv[1]
 
-                        for row_index in range(
-                            my_row_indices[0], my_row_indices[-1] + 1):
-                            for col_vec_index, col_vec in enumerate(col_vecs):
-                                IP_array[
-                                    row_index,
-                                    my_col_indices[col_vec_index]
-                                ] = self.inner_product(
-                                    row_vecs[row_index - my_row_indices[0]],
-                                    col_vec)
-                            if (
-                                (time() - self.prev_print_time) >
-                                self.print_interval):
-                                num_completed_IPs = np.sum(
-                                    np.abs(np.triu(IP_array)) > 0.)
-                                percent_completed_IPs = (
-                                    num_completed_IPs *
-                                    parallel.get_num_MPI_workers() /
-                                    total_num_IPs) * 100.
-                                self.print_msg(
-                                    'Completed %.1f%% of inner products' %
-                                    percent_completed_IPs,
-                                    output_channel='stderr')
-                                self.prev_print_time = time()
+                        if len(col_vecs) > 0:
+                            IP_array[
+                                my_row_indices[0]:my_row_indices[-1] + 1,
+                                my_col_indices
+                            ] = self._compute_IP_block(row_vecs, col_vecs)
+                        if (
+                            (time() - self.prev_print_time) >
+                            self.print_interval):
+                            num_completed_IPs = np.sum(
+                                np.abs(np.triu(IP_array)) > 0.)
+                            percent_completed_IPs = (
+                                num_completed_IPs *
+                                parallel.get_num_MPI_workers() /
+                                total_num_IPs) * 100.
+                            self.print_msg(
+                                'Completed %.1f%% of inner products' %
+                                percent_completed_IPs,
+                                output_channel='stderr')
+                            self.prev_print_time = time()
 
                     # Sync after send/receive
                     parallel.barrier()
@@ -709,33 +1259,42 @@ class VectorSpaceHandles(object):
             # Start at index after last row, continue to last column. This part
             # of the code is the same as in compute_IP_array, as of
             # revision 141.
+            col_chunk_indices = []
             for start_col_index in range(
                 end_row_index, num_vecs, num_cols_per_chunk):
                 end_col_index = min(
                     start_col_index + num_cols_per_chunk, num_vecs)
                 proc_col_tasks = parallel.find_assignments(list(range(
                     start_col_index, end_col_index)))[parallel.get_rank()]
+                if len(proc_col_tasks) > 0:
+                    col_chunk_indices.append(list(range(
+                        proc_col_tasks[0], proc_col_tasks[-1] + 1)))
+                else:
+                    col_chunk_indices.append([])
 
+            get_thread = None
+            for col_chunk_index, col_indices in enumerate(col_chunk_indices):
                 # Pass the col vecs to proc with rank -> mod(rank+1,numProcs)
                 # Must do this for each processor, until data makes a circle
                 col_vecs_recv = (None, None)
-                if len(proc_col_tasks) > 0:
-                    col_indices = list(range(
-                        proc_col_tasks[0], proc_col_tasks[-1] + 1))
-                else:
-                    col_indices = []
 
                 for num_passes in range(parallel.get_num_procs()):
                     # If on the first pass, get the col vecs, no send/recv
                     # This is all that is called when in serial, loop iterates
                     # once.
+                    # In the background, get the col vecs for the next chunk
+                    # while these ones are used.
                     if num_passes == 0:
-                        if len(col_indices) > 0:
-                            col_vecs = [
-                                col_handle.get() for col_handle in
-                                vec_handles[col_indices[0]:col_indices[-1] + 1]]
+                        if get_thread is not None:
+                            col_vecs = get_thread.join()
                         else:
-                            col_vecs = []
+                            col_vecs = col_vec_cache.get_vecs(
+                                col_indices, stack=self._is_array_IP())
+                        if col_chunk_index + 1 < len(col_chunk_indices):
+                            get_thread = self._start_get_thread(
+                                col_vec_cache,
+                                col_chunk_indices[col_chunk_index + 1],
+                                stack=self._is_array_IP())
                     else:
                         # Determine whom to communicate with
                         dest = (
@@ -766,15 +1325,11 @@ class VectorSpaceHandles(object):
                     # the indices of the IP_array columns to be
                     # filled in.
                     if len(proc_row_tasks) > 0:
-                        for row_index in range(
-                            proc_row_tasks[0], proc_row_tasks[-1] + 1):
-                            for col_vec_index, col_vec in enumerate(col_vecs):
-                                IP_array[
-                                    row_index,
-                                    col_indices[col_vec_index]
-                                ] = self.inner_product(
-                                    row_vecs[row_index - proc_row_tasks[0]],
-                                    col_vec)
+                        if len(col_vecs) > 0:
+                            IP_array[
+                                proc_row_tasks[0]:proc_row_tasks[-1] + 1,
+                                col_indices
+                            ] = self._compute_IP_block(row_vecs, col_vecs)
                         if (
                             (time() - self.prev_print_time) >
                             self.print_interval):
@@ -798,18 +1353,11 @@ class VectorSpaceHandles(object):
         if parallel.is_distributed():
             IP_array = parallel.custom_comm.allreduce(IP_array)
 
-        # Create a mask for the repeated values.  Select values that are zero
-        # in the upper triangular portion (not computed there) but nonzero in
-        # the lower triangular portion (computed there).  For the case where
-        # the inner product is not perfectly symmetric, this will select the
-        # computation done in the upper triangular portion.
-        mask = np.multiply(IP_array == 0., IP_array.conj().T != 0)
-
-        # Collect values below diagonal
-        IP_array += np.multiply(np.triu(IP_array.conj().T, 1), mask)
-
-        # Symmetrize array
-        IP_array = np.triu(IP_array) + np.triu(IP_array, 1).conj().T
+        # Collect values computed below the diagonal, i.e., that are zero in
+        # the upper triangular portion, then symmetrize the array.  For the
+        # case where the inner product is not perfectly symmetric, this selects
+        # the computation done in the upper triangular portion.
+        _symmetrize_upper(IP_array)
 
         # Print progress
         self.print_msg(
@@ -902,42 +1450,50 @@ class VectorSpaceHandles(object):
                 'Number of coeff_array cols (%d) does not equal number of '
                 'output handles (%d)') % (coeff_array.shape[1], num_sums))
 
-        # Burn the first operations to allow for slow imports
-        test_vec_burn = basis_vec_handles[0].get()
-        test_vec_burn_3 = test_vec_burn + 2. * test_vec_burn
-        del test_vec_burn, test_vec_burn_3
-
-        # Time get method
-        start_time = time()
-        test_vec = basis_vec_handles[0].get()
-        get_time = time() - start_time
-
-        # Time vector space operations
-        start_time = time()
-        test_vec_3 = test_vec + 2.*test_vec
-        add_scale_time = time() - start_time
-        del test_vec, test_vec_3
-
-        # Estimate time for all linear combinations
-        vecs_per_worker = (
-            self.max_vecs_per_node * parallel.get_num_nodes() /
-            parallel.get_num_MPI_workers())
-        num_gets = (
-            num_sums /
-            (parallel.get_num_MPI_workers()* (vecs_per_worker - 2)) +
-            num_bases / parallel.get_num_MPI_workers())
-        num_add_scales = num_sums * num_bases / parallel.get_num_MPI_workers()
-        self.print_msg(
-            'Linear combinations will take at least %.1f minutes' %
-            (num_gets * get_time / 60. + num_add_scales * add_scale_time / 60.))
+        # Timing requires extra gets and vector operations, so only do it if
+        # the estimate will be printed.
+        if self.verbosity > 0 and parallel.is_rank_zero():
+            # Burn the first operations to allow for slow imports
+            test_vec_burn = basis_vec_handles[0].get()
+            test_vec_burn_3 = test_vec_burn + 2. * test_vec_burn
+            del test_vec_burn, test_vec_burn_3
+
+            # Time get method
+            start_time = time()
+            test_vec = basis_vec_handles[0].get()
+            get_time = time() - start_time
+
+            # Time vector space operations
+            start_time = time()
+            test_vec_3 = test_vec + 2.*test_vec
+            add_scale_time = time() - start_time
+            del test_vec, test_vec_3
+
+            # Estimate time for all linear combinations
+            vecs_per_worker = (
+                self.max_vecs_per_node * parallel.get_num_nodes() /
+                parallel.get_num_MPI_workers())
+            num_gets = (
+                num_sums /
+                (parallel.get_num_MPI_workers()* (vecs_per_worker - 2)) +
+                num_bases / parallel.get_num_MPI_workers())
+            num_add_scales = (
+                num_sums * num_bases / parallel.get_num_MPI_workers())
+            self.print_msg(
+                'Linear combinations will take at least %.1f minutes' % (
+                    num_gets * get_time / 60. +
+                    num_add_scales * add_scale_time / 60.))
 
         # Convenience variable
         rank = parallel.get_rank()
 
         # num_bases_per_proc_chunk is the num of bases each proc gets at once.
+        # When getting in the background, leave room for the next bases too.
         num_bases_per_proc_chunk = 1
         num_sums_per_proc_chunk = (
             self.max_vecs_per_proc - num_bases_per_proc_chunk)
+        if self.background_io:
+            num_sums_per_proc_chunk -= num_bases_per_proc_chunk
 
         # Divide up tasks
         basis_tasks = parallel.find_assignments(list(range(num_bases)))
@@ -960,6 +1516,26 @@ class VectorSpaceHandles(object):
                 'nodes or max_vecs_per_node to reduce redundant retrieves and '
                 'get a big speedup.') % (num_bases, num_sum_put_iters))
 
+        # Find the basis indices this proc gets in each iteration of the basis
+        # get loop.
+        basis_get_indices = []
+        for basis_get_index in range(num_basis_get_iters):
+            if len(basis_tasks[rank]) > 0:
+                start_basis_index = min(
+                    basis_tasks[rank][0] +(
+                        basis_get_index*num_bases_per_proc_chunk),
+                    basis_tasks[rank][-1] + 1)
+                end_basis_index = min(
+                    start_basis_index + num_bases_per_proc_chunk,
+                    basis_tasks[rank][-1] + 1)
+                basis_get_indices.append(list(range(
+                    start_basis_index, end_basis_index)))
+            else:
+                basis_get_indices.append([])
+
+        # The basis vecs are retrieved once per sum put iteration, so cache them
+        basis_vec_cache = _VecCache(basis_vec_handles, self.cache_bytes)
+        put_thread = None
         for sum_put_index in range(num_sum_put_iters):
             if len(sum_tasks[rank]) > 0:
                 start_sum_index = min(
@@ -969,27 +1545,14 @@ class VectorSpaceHandles(object):
                 end_sum_index = min(
                     start_sum_index + num_sums_per_proc_chunk,
                     sum_tasks[rank][-1] + 1)
-
-                # Create empty list on each processor
-                sum_layers = [None] * (end_sum_index - start_sum_index)
             else:
                 start_sum_index = 0
                 end_sum_index = 0
-                sum_layers = []
+            sum_layers = None
 
+            get_thread = None
             for basis_get_index in range(num_basis_get_iters):
-                if len(basis_tasks[rank]) > 0:
-                    start_basis_index = min(
-                        basis_tasks[rank][0] +(
-                            basis_get_index*num_bases_per_proc_chunk),
-                        basis_tasks[rank][-1] + 1)
-                    end_basis_index = min(
-                        start_basis_index + num_bases_per_proc_chunk,
-                        basis_tasks[rank][-1] + 1)
-                    basis_indices = list(range(
-                        start_basis_index, end_basis_index))
-                else:
-                    basis_indices = []
+                basis_indices = basis_get_indices[basis_get_index]
 
                 # Pass the basis vecs to proc with rank -> mod(rank+1,num_procs)
                 # Must do this for each processor, until data makes a circle
@@ -999,14 +1562,19 @@ class VectorSpaceHandles(object):
                     # no send/recv.
                     # This is all that is called when in serial,
                     # loop iterates once.
+                    # In the background, get the basis vecs for the next
+                    # iteration while these ones are used.
                     if pass_index == 0:
-                        if len(basis_indices) > 0:
-                            basis_vecs = [
-                                basis_handle.get() for basis_handle in
-                                basis_vec_handles[
-                                    basis_indices[0]:basis_indices[-1] + 1]]
+                        if get_thread is not None:
+                            basis_vecs = get_thread.join()
                         else:
-                            basis_vecs = []
+                            basis_vecs = basis_vec_cache.get_vecs(
+                                basis_indices, stack=True)
+                        if basis_get_index + 1 < num_basis_get_iters:
+                            get_thread = self._start_get_thread(
+                                basis_vec_cache,
+                                basis_get_indices[basis_get_index + 1],
+                                stack=True)
                     else:
                         # Figure out with whom to communicate
                         source = (
@@ -1035,31 +1603,40 @@ class VectorSpaceHandles(object):
                     # Compute the scalar multiplications for this set of data.
                     # basis_indices stores the indices of the coeff_array to
                     # use.
-                    for sum_index in range(start_sum_index, end_sum_index):
-                        for basis_index, basis_vec in enumerate(basis_vecs):
-                            sum_layer = basis_vec * coeff_array[
-                                    basis_indices[basis_index], sum_index]
-                            if sum_layers[sum_index - start_sum_index] is None:
-                                sum_layers[
-                                    sum_index-start_sum_index] = sum_layer
-                            else:
-                                sum_layers[
-                                    sum_index - start_sum_index] += sum_layer
+                    if (
+                        len(basis_vecs) > 0 and
+                        end_sum_index > start_sum_index):
+                        sum_layers = self._add_sum_layers(
+                            sum_layers, basis_vecs, coeff_array[
+                                basis_indices, start_sum_index:end_sum_index])
                         if (
                             (time() - self.prev_print_time) >
                             self.print_interval):
                             self.print_msg(
                                 'Completed %.1f%% of linear combinations' %
-                                (sum_index * 100. / len(sum_tasks[rank])),
+                                (end_sum_index * 100. / len(sum_tasks[rank])),
                                 output_channel='stderr')
                             self.prev_print_time = time()
 
-            # Completed this set of sum vecs, puts them to memory or file
-            for sum_index in range(start_sum_index, end_sum_index):
-                sum_vec_handles[sum_index].put(
-                    sum_layers[sum_index - start_sum_index])
+            # Completed this set of sum vecs, puts them to memory or file.
+            # When putting in the background, first wait for the previous set
+            # to finish, so that at most two sets are in memory.
+            if put_thread is not None:
+                put_thread.join()
+                put_thread = None
+            if self.background_io and end_sum_index > start_sum_index:
+                put_thread = _BackgroundThread(
+                    _put_vecs, sum_vec_handles[start_sum_index:end_sum_index],
+                    sum_layers)
+                put_thread.start()
+            else:
+                for sum_index in range(start_sum_index, end_sum_index):
+                    sum_vec_handles[sum_index].put(
+                        sum_layers[sum_index - start_sum_index])
             del sum_layers
 
+        if put_thread is not None:
+            put_thread.join()
         self.print_msg(
             'Completed 100% of linear combinations', output_channel='stderr')
         self.prev_print_time = time()
@@ -1075,3 +1652,19 @@ class VectorSpaceHandles(object):
 
     def __ne__(self, other):
         return not self.__eq__(other)
+
+
+    def __deepcopy__(self, memo):
+        """Copies the configuration, sharing the inner product function.  The
+        inner product may hold large arrays (e.g., the grids and weights of
+        :py:class:`InnerProductTrapz`) or state that cannot be copied, and is
+        never modified, so there is no need to copy it."""
+        cls = self.__class__
+        new = cls.__new__(cls)
+        memo[id(self)] = new
+        for key, value in self.__dict__.items():
+            if key == 'inner_product':
+                new.inner_product = value
+            else:
+                setattr(new, key, copy.deepcopy(value, memo))
+        return new